@@ -0,0 +1,199 @@
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from json import dumps, loads
+from multiprocessing import get_context
+from pathlib import Path
+from resource import getrusage, RUSAGE_SELF
+from sys import exit
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import polars as pl
+import polars.selectors as cs
+
+from treeSlice import (
+    expand_model, refine_model, from_mList, from_mALPC, to_mALPC, gen_hash_keys, gen_tree_hashes, test_equal,
+    cs_ptr, ctail, cdepth, cis_root, cis_leaf, cptr
+)
+
+forest_shapes: tuple[str, ...] = ("wide", "deep", "tiny", "skewed")
+label_dtypes: tuple[str, ...] = ("str", "enum", "struct", "array")
+bench_stages: tuple[str, ...] = ("expand_model", "refine_model", "from_mList", "from_mALPC", "gen_hash_keys", "gen_tree_hashes", "test_equal")
+bench_rows: tuple[int, ...] = (10_000, 100_000, 1_000_000)
+# 10M and 100M rows are opt-in (--rows), the deep shape alone carries 200 p### columns per row
+
+_unsupported: dict[str, tuple[str, ...]] = {
+    "array": ("gen_hash_keys",)
+    # the Progeny digests cast labels to Utf8, which Array labels do not support (gen_tree_hashes hashes their JSON)
+}
+
+
+def gen_forest(shape: str, rows: int, /, *, labels: str = "str", seed: int = 0) -> pl.DataFrame:
+    """
+    Generates a seeded synthetic MVP forest (cTail, cDepth) of exactly rows nodes in pre-order.
+    Each shape draws a target depth per row, and the pre-order rule (a node is at most one level deeper
+    than the node before it) is enforced in one vectorized pass: cDepth = i + cum_min(target - i).
+    wide: Roots of 10,000 nodes, mostly one level deep. deep: chains of 200 levels with a little
+    branching. tiny: Roots of 3 nodes. skewed: geometric depths, so a few nodes have huge fan-out.
+    Root labels are unique (test_equal matches Root trees by cHead); the other labels repeat.
+    """
+    assert shape in forest_shapes and labels in label_dtypes and rows > 0
+
+    idx: pl.Expr = pl.int_range(rows, dtype=pl.Int64)
+    noise: pl.Expr = idx.hash(seed)
+    target: pl.Expr = {
+        "wide":   pl.when(idx.mod(10_000).eq(0)).then(0).otherwise(noise.mod(8).eq(0).cast(dtype=pl.Int64).add(1)),
+        "deep":   pl.when(idx.mod(200).eq(0)).then(0).otherwise(idx.mod(200).sub(noise.mod(3)).clip(lower_bound=1)),
+        "tiny":   pl.when(idx.mod(3).eq(0)).then(0).otherwise(1),
+        "skewed": pl.when(idx.mod(5_000).eq(0)).then(0).otherwise(noise.bitwise_trailing_zeros().clip(upper_bound=30).add(1).cast(dtype=pl.Int64))
+    }[shape]
+
+    mvp: pl.DataFrame = (
+        pl.select(idx.alias("xWS_Idx"), target.alias("xWS_Target"), noise.floordiv(7).mod(4_096).alias("xWS_Label"))
+        .with_columns(pl.col("xWS_Idx").add(pl.col("xWS_Target").sub(pl.col("xWS_Idx")).cum_min()).cast(dtype=pl.UInt32).alias(cdepth))
+        .with_columns(pl.when(pl.col(cdepth).eq(0)).then(pl.col("xWS_Idx").add(4_096)).otherwise("xWS_Label").alias("xWS_Label"))
+    )
+    label: pl.Expr = pl.format("n{}", "xWS_Label")
+
+    return mvp.select(
+        {
+            "str":    label,
+            "enum":   label.cast(dtype=pl.Enum(mvp.select(pl.format("n{}", "xWS_Label").unique(maintain_order=True)).to_series())),
+            "struct": pl.struct(pl.col("xWS_Label").mod(4).alias("type"), label.alias("obj")),
+            "array":  pl.concat_list(label, pl.col(cdepth).cast(dtype=pl.String)).list.to_array(width=2)
+        }[labels].alias(ctail),
+        cdepth
+    )
+
+
+def _stage_input(stage: str, mvp: pl.DataFrame, /) -> tuple:
+    # the (untimed) input of each stage, derived from the generated forest
+    if stage == "expand_model":
+        return (mvp,)
+    full: pl.DataFrame = mvp.pipe(expand_model).collect()
+    if stage == "refine_model":
+        return (full.filter(pl.col(cis_leaf)).select(cs_ptr),)
+    if stage == "from_mList":
+        return (full.select(pl.concat_list(cs_ptr).list.drop_nulls().alias(cptr)),)
+    if stage == "from_mALPC":
+        return (to_mALPC(full),)
+    if stage in ("gen_hash_keys", "gen_tree_hashes"):
+        return (full,)
+    return (
+        full,
+        full.with_columns(pl.col(cis_root).cum_sum().alias("xWS_Root"))
+        .sort("xWS_Root", descending=True, maintain_order=True)
+        .select(ctail, cdepth).pipe(expand_model).collect()
+        # the same forest, Root trees in reverse order
+    )
+
+
+_stage_call: dict = {
+    "expand_model":  lambda mvp: expand_model(mvp).collect(),
+    "refine_model":  lambda flat: refine_model(flat).collect(),
+    "from_mList":    lambda m_list: from_mList(m_list),
+    "from_mALPC":    lambda m_alpc: from_mALPC(m_alpc, max_depth=1_000).collect(),
+    "gen_hash_keys": lambda full: gen_hash_keys(full),
+    "gen_tree_hashes": lambda full: gen_tree_hashes(full),
+    "test_equal":    lambda tree_x, tree_y: test_equal(tree_x, tree_y)
+}
+
+
+def _write_stage_input(shape: str, rows: int, labels: str, stage: str, seed: int, directory: str, /) -> tuple[str, ...]:
+    # builds the input of a stage and stores it as Parquet, run in its own process so that building it (an
+    # expand_model for most stages) never raises the peak resident set of the process that times the stage
+    args: tuple = _stage_input(stage, gen_forest(shape, rows, labels=labels, seed=seed))
+    for position, arg in enumerate(args):
+        arg.write_parquet(f"{directory}/{stage}_{position}.parquet")
+    return tuple(f"{directory}/{stage}_{position}.parquet" for position in range(len(args)))
+
+
+def run_stage(shape: str, rows: int, labels: str, stage: str, repeat: int, seed: int, /) -> dict:
+    """
+    Times one stage on one generated forest (best of repeat runs) and measures its peak memory: the growth
+    of this process's peak resident set over the stage. The input is built in a separate process and read
+    back from Parquet, so the peak is not set by the setup, and run_suite runs each stage in a fresh process
+    so the peak of one stage is not hidden by the peak of another.
+    """
+    with TemporaryDirectory() as tmp_dir:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            paths: tuple[str, ...] = executor.submit(_write_stage_input, shape, rows, labels, stage, seed, tmp_dir).result()
+        args: tuple = tuple(pl.read_parquet(path) for path in paths)
+    peak_before: int = getrusage(RUSAGE_SELF).ru_maxrss
+
+    timings: list[float] = []
+    for _ in range(repeat):
+        started: float = perf_counter()
+        _stage_call[stage](*args)
+        timings.append(perf_counter() - started)
+
+    return {
+        "case": f"{shape}/{labels}/{rows}", "stage": stage, "rows": rows, "seconds": min(timings),
+        "rows_per_sec": rows / min(timings),
+        "peak_mib": (getrusage(RUSAGE_SELF).ru_maxrss - peak_before) / 1024
+        # ru_maxrss is in KiB on Linux
+    }
+
+
+def run_suite(shapes: tuple[str, ...], rows: tuple[int, ...], labels: tuple[str, ...], stages: tuple[str, ...], /, *, repeat: int = 3, seed: int = 0) -> pl.DataFrame:
+    """
+    Runs every (shape, rows, labels, stage) combination, each in its own spawned process.
+    """
+    jobs: tuple[tuple, ...] = tuple(
+        (shape, n_rows, dtype, stage, repeat, seed)
+        for shape in shapes for n_rows in rows for dtype in labels for stage in stages
+        if stage not in _unsupported.get(dtype, ())
+    )
+    results: list[dict] = []
+    for job in jobs:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            results.append(executor.submit(run_stage, *job).result())
+        print("{case:<28} {stage:<14} {seconds:>10.4f} s {rows_per_sec:>14,.0f} rows/s {peak_mib:>10.1f} MiB".format(**results[-1]), flush=True)
+
+    return pl.DataFrame(results)
+
+
+def check_baseline(results: pl.DataFrame, baseline: pl.DataFrame, /, *, tolerance: float = 0.25) -> pl.DataFrame:
+    """
+    Returns the stages that regressed past a stored baseline: throughput below (1 - tolerance) of the
+    baseline, or peak memory above (1 + tolerance) of it (with 16 MiB of slack for allocator noise).
+    Cases missing from the baseline are not checked.
+    """
+    return (
+        results
+        .join(baseline.select("case", "stage", "rows_per_sec", "peak_mib"), on=("case", "stage"), how="inner", suffix="_baseline")
+        .filter(
+            pl.col("rows_per_sec").lt(pl.col("rows_per_sec_baseline").mul(1 - tolerance)) |
+            pl.col("peak_mib").gt(pl.col("peak_mib_baseline").mul(1 + tolerance).add(16))
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="treeSlice benchmark suite")
+    parser.add_argument("--shapes", nargs="+", default=forest_shapes, choices=forest_shapes)
+    parser.add_argument("--rows", nargs="+", type=int, default=bench_rows)
+    parser.add_argument("--labels", nargs="+", default=label_dtypes, choices=label_dtypes)
+    parser.add_argument("--stages", nargs="+", default=bench_stages, choices=bench_stages)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default="bench_baseline.json")
+    parser.add_argument("--save", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    options = parser.parse_args()
+
+    results: pl.DataFrame = run_suite(
+        tuple(options.shapes), tuple(options.rows), tuple(options.labels), tuple(options.stages),
+        repeat=options.repeat, seed=options.seed
+    )
+
+    if options.save:
+        Path(options.baseline).write_text(dumps(results.to_dicts(), indent=1))
+        print(f"\n\nbaseline saved to {options.baseline}\n\n")
+    elif Path(options.baseline).exists():
+        regressed: pl.DataFrame = check_baseline(results, pl.DataFrame(loads(Path(options.baseline).read_text())), tolerance=options.tolerance)
+        if regressed.height:
+            with pl.Config(tbl_rows=-1, tbl_cols=-1, tbl_width_chars=300):
+                print(f"\n\nREGRESSIONS detected\n\n{regressed}\n\n")
+            exit(1)
+        print(f"\n\nNO REGRESSIONS detected\n\n")
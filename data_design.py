@@ -457,8 +457,10 @@ unit_test_cc_mvp.parquet (49246, 2)
 if __name__ == "__main__":
     # run unit tests
 
-    from json import loads
-    from itertools import chain, combinations, pairwise
+    from json import dumps, loads
+    from pathlib import Path
+    from itertools import combinations
+    from tempfile import TemporaryDirectory
 
     import polars as pl
     import polars.selectors as cs
@@ -466,8 +468,12 @@ if __name__ == "__main__":
     import duckdb as db
 
     from treeSlice import (
-        expand_model, refine_model, from_mALPC, from_mList, test_equal,
-        cs_ptr, chead, ctail, cdepth, cstart, cstop, cparent, cchild, cbkey, cptr
+        expand_model, refine_model, from_mALPC, from_mList, test_equal, sink_model, expand_model_parallel,
+        gen_hash_keys, gen_ancestors, TreeIndex, TreeStore, LCAIndex, delete_subtree, insert_subtree, move_subtree, append_trees,
+        compact_model, restore_model, use_enums, render_model, profile_stages, validate_model, gen_tree_hashes, tree_diff,
+        share_subtrees, expand_shared, from_mJSON, write_model, read_subtree, register_model,
+        subtree_aggregate, path_accumulate, to_mALPC, to_mList, sink_mJSON,
+        cs_ptr, cs_vis, cs_core_12, hk_iso, chead, ctail, cdepth, cstart, cstop, csize, cwidth, cout, cleft, cright, cis_root, cparent, cchild, cbkey, cptr, hk_ptr, hk_schema, hk_nspace, hk_kvp_treekey, hk_schema_tree, hk_nspace_tree
     )
 
     _tested_dtypes = (
@@ -522,7 +528,7 @@ if __name__ == "__main__":
     del df_list_of_Nx_int, df_list_of_Nx_str, df_list_of_Nx_float, df_array_of_4xFixed_int, df_JSON_array_of_4xFixed_int, df_JSON_array_of_4xFixed_str, df_JSON_array_of_Nx_JSON_object2, df_list_of_Nx_struct2, df_list_of_Nx_list2, df_list_of_Nx_array2
 
     assert_frame_equal(
-        pl.read_parquet(example_mvp).pipe(expand_model, verify_first_n=10_000).collect(),
+        pl.read_parquet(example_mvp).pipe(expand_model, vis=True, verify_first_n=10_000).collect(),
         # from MVP to FULL model
         pl.DataFrame([
             pl.Series('p000_3', ['A1', 'A1', 'A1', 'A1', 'A1', 'A1', 'A1', 'A2', 'A2', 'A2', 'A2', 'A2', 'A2', 'Z', 'Y', 'Y', 'Y', 'Y', 'Y', 'Y'], dtype=pl.String),
@@ -587,15 +593,115 @@ if __name__ == "__main__":
         # from ALIST to FULL model
         check_exact=True, check_row_order=True, check_column_order=True
     )
+    assert_frame_equal(
+        pl.read_parquet(example_mvp).pipe(expand_model, verify_first_n=10_000).collect(),
+        # from MVP to FULL model
+        pl.read_parquet(example_alist)
+        .rename({"parent": cparent, "child": cchild, "business_key": cbkey})
+        .pipe(from_mALPC, pointer_doubling=True).pipe(expand_model, verify_first_n=10_000).collect(),
+        # from ALIST to FULL model (pointer doubling)
+        check_exact=True, check_row_order=True, check_column_order=True
+    )
 
-    for (prev_a, prev_b), (cur_a, cur_b) in pairwise(chain(
-        [(None, None)],
-        combinations(pl.read_parquet(example_full_many_permutations).get_column('PERMUTATION_ID').unique().sort().to_list(), 2)
-    )):
-        df_a = pl.read_parquet(example_full_many_permutations).filter(pl.col('PERMUTATION_ID').eq(cur_a)).select(chead, ctail, cdepth, cstart, cstop) if prev_a != cur_a else df_a
-        df_b = pl.read_parquet(example_full_many_permutations).filter(pl.col('PERMUTATION_ID').eq(cur_b)).select(chead, ctail, cdepth, cstart, cstop) if prev_b != cur_b else df_b
-        assert (not df_a.equals(df_b)) and test_equal(df_a, df_b)
+    example_json: dict = {
+        "A1": {"B": {"C": 9.700000000000001, "D": 9.700000000000001}, "E": {"F": 9.700000000000001, "G": 9.700000000000001}},
+        "A2": {"E": {"E": 9.700000000000001, "G": {"C": 9.600000000000001}}, "B": 9.8},
+        "Z": 9.9,
+        "Y": {"V": {"V": 9.700000000000001}, "W": 9.8, "X": {"X": 9.700000000000001}}
+    }
+    # example_mvp as one nested JSON object, its leaves carry user_value1
+    with TemporaryDirectory() as tmp_dir:
+        Path(f"{tmp_dir}/example.ndjson").write_text(f"{dumps({'id': 'first'} | example_json)}\n{dumps({'id': 'second', 'Z': 1.0})}\n")
+        Path(f"{tmp_dir}/example.json").write_text(dumps(example_json))
+        for json_input in (example_json, dumps(example_json), f"{tmp_dir}/example.json", f"{tmp_dir}/example.ndjson"):
+            assert_frame_equal(
+                from_mJSON(json_input, root="id" if json_input == f"{tmp_dir}/example.ndjson" else None, value="user_value1").collect()
+                .filter(pl.col(cdepth).gt(0)).with_columns(pl.col(cdepth).sub(1)).head(20),
+                # from nested JSON to MVP model, below the Root of the (first) document
+                pl.read_parquet(example_mvp).select(ctail, cdepth, "user_value1"),
+                check_exact=True, check_row_order=True, check_column_order=True
+            )
+        assert from_mJSON(f"{tmp_dir}/example.ndjson", root="id").pipe(expand_model).filter(pl.col(cdepth).eq(0)).collect().get_column(ctail).to_list() == ["first", "second"]
+        Path(f"{tmp_dir}/late.ndjson").write_text("".join(f"{dumps({'id': str(doc)} | ({'late': {'x': 1.0}} if doc == 150 else {}))}\n" for doc in range(200)))
+        assert from_mJSON(f"{tmp_dir}/late.ndjson", root="id").filter(pl.col(cdepth).gt(0)).collect().get_column(ctail).to_list() == ["late", "x"]
+        # a key first seen past the 100th document is still read, every document is inferred
+
+    for mvp_model in (example_mvp, unit_test_aa_mvp, unit_test_bb_mvp, unit_test_cc_mvp):
+        df: pl.DataFrame = pl.read_parquet(mvp_model).pipe(expand_model).collect()
+        for pointer_doubling in (False, True):
+            assert_frame_equal(
+                df.pipe(to_mALPC).pipe(from_mALPC, pointer_doubling=pointer_doubling).pipe(expand_model).collect(),
+                # from FULL model to ALIST and back
+                df,
+                check_exact=True, check_row_order=True, check_column_order=True
+            )
+        assert_frame_equal(
+            df.pipe(to_mList).pipe(from_mList).pipe(expand_model).collect(),
+            # from FULL model to path lists and back
+            df,
+            check_exact=True, check_row_order=True, check_column_order=True
+        )
+        assert_frame_equal(
+            df.pipe(to_mList),
+            # the p### columns concatenated, and the ancestor search of a model without them
+            df.drop(cs_ptr).pipe(to_mList),
+            check_exact=True, check_row_order=True, check_column_order=True
+        )
+
+    with TemporaryDirectory() as tmp_dir:
+        df: pl.DataFrame = pl.read_parquet(example_mvp).pipe(expand_model).collect()
+        sink_mJSON(df, f"{tmp_dir}/example.ndjson", root="id", value="user_value1")
+        assert [loads(line) for line in Path(f"{tmp_dir}/example.ndjson").read_text().splitlines()] == [
+            {"id": label} | (example_json[label] if isinstance(example_json[label], dict) else {}) for label in example_json
+        ]
+        # from FULL model to nested JSON, one document per Root (a Root holds no value)
+        sink_mJSON(df, f"{tmp_dir}/batched.ndjson", root="id", value="user_value1", rows_per_batch=3)
+        assert Path(f"{tmp_dir}/batched.ndjson").read_bytes() == Path(f"{tmp_dir}/example.ndjson").read_bytes()
+        assert_frame_equal(
+            from_mJSON(f"{tmp_dir}/example.ndjson", root="id", value="user_value1").collect().head(5),
+            df.select(ctail, cdepth, pl.when(pl.col(cdepth).gt(0)).then("user_value1").alias("user_value1")).head(5),
+            # the first document reads back as it was written (later ones take the first one's sibling order)
+            check_exact=True, check_row_order=True, check_column_order=True
+        )
+
+    permutations: dict[int, pl.DataFrame] = {
+        permutation_id: df.select(chead, ctail, cdepth, cstart, cstop)
+        for (permutation_id,), df in pl.read_parquet(example_full_many_permutations).partition_by("PERMUTATION_ID", as_dict=True).items()
+    }
+    for cur_a, cur_b in combinations(sorted(permutations), 2):
+        df_a, df_b = permutations[cur_a], permutations[cur_b]
+        assert (not df_a.equals(df_b)) and test_equal(df_a, df_b) and test_equal(df_a, df_b, ignore_sibling_order=True)
         print(f"{cur_a:03}   {cur_b:03}")
+    assert pl.concat(gen_tree_hashes(df) for df in permutations.values()).group_by(hk_iso).agg(pl.len()).get_column("len").to_list() == [len(permutations)] * 4
+    # every Root tree falls in one isomorphism class, once per permutation
+    for nested_label in (pl.struct(pl.col(cdepth).cast(dtype=pl.Int64).alias("type"), pl.col(ctail).alias("obj")), pl.concat_list(ctail, ctail)):
+        assert pl.concat(
+            gen_tree_hashes(df.with_columns(nested_label.alias(ctail))) for df in permutations.values()
+        ).group_by(hk_iso).agg(pl.len()).get_column("len").to_list() == [len(permutations)] * 4
+    # Struct and List labels are hashed as they are, a List has no string cast
+
+    df: pl.DataFrame = pl.read_parquet(unit_test_aa_mvp).pipe(expand_model).collect()
+    parent: int = df.filter(pl.col(cout).ge(2)).item(0, cstart)
+    last_child: int = df.slice(parent + 1, df.item(parent, csize) - 1).filter(pl.col(cdepth).eq(df.item(parent, cdepth) + 1)).item(-1, cstart)
+    df_moved: pl.DataFrame = move_subtree(df, last_child, parent=parent, position=parent + 1)
+    # the same forest, the last child of parent moved in front of its siblings
+    assert not test_equal(df, df_moved) and test_equal(df, df_moved, ignore_sibling_order=True)
+    df_relabelled: pl.DataFrame = df_moved.with_columns(pl.when(pl.col(cstart).eq(parent + 1)).then(pl.col(ctail).shift(1)).otherwise(ctail).alias(ctail))
+    assert not test_equal(df, df_relabelled, ignore_sibling_order=True)
+    assert gen_tree_hashes(df, labels=False).equals(gen_tree_hashes(df_relabelled, labels=False))
+    # relabelled, the trees keep their shape
+
+    assert tree_diff(df, df_moved).get_column("change").eq("unchanged").all()
+    # a reorder of siblings is no change, and is reported at the Roots alone
+    df_diff: pl.DataFrame = pl.read_parquet(example_mvp).pipe(expand_model).collect()
+    assert tree_diff(df_diff, move_subtree(df_diff, 8, parent=1)).filter(pl.col("change").eq("moved")).rows() == [("moved", hk, "E", 8, 12, 4, 8) for hk in
+        gen_hash_keys(move_subtree(df_diff, 8, parent=1)).filter(pl.col(cstart).eq(4)).get_column(hk_ptr)]
+    assert tree_diff(df_diff, delete_subtree(df_diff, 11)).filter(pl.col("change").is_in(["added", "removed", "moved"])).select("change", ctail, "cStart_old").rows() == [("removed", "C", 11)]
+    df_relabelled: pl.DataFrame = pl.read_parquet(example_mvp).with_columns(pl.when(pl.int_range(pl.len()).eq(2)).then(pl.lit("Q")).otherwise(ctail).alias(ctail)).pipe(expand_model).collect()
+    assert tree_diff(df_diff, df_relabelled).filter(pl.col("change").ne("unchanged")).select("change", ctail, "cStart_old", "cStart_new").rows() == [
+        ("changed", "A1", 0, 0), ("changed", "B", 1, 1), ("added", "Q", None, 2), ("removed", "C", 2, None)
+    ]
+    # a relabelled leaf changes its ancestors alone, each sibling subtree is reported unchanged at its highest node
 
     for mvp_model, lf in (
         (example_mvp, pl.scan_parquet(example_mvp).select(ctail, cdepth)),
@@ -611,4 +717,363 @@ if __name__ == "__main__":
         db.sql(f"""SUMMARIZE df;""").show(max_rows=200, max_width=5_000)
         db.sql(f"""SELECT * FROM df;""").show(max_rows=50, max_width=5_000)
 
+    with TemporaryDirectory() as tmp_dir:
+        for mvp_model, rows_per_batch in ((example_mvp, 3), (unit_test_aa_mvp, 5_000), (unit_test_cc_mvp, 1)):
+            assert_frame_equal(
+                pl.read_parquet(mvp_model).pipe(expand_model).collect(),
+                # from MVP to FULL model
+                sink_model(mvp_model, f"{tmp_dir}/{mvp_model}", rows_per_batch=rows_per_batch).collect(),
+                # from MVP to FULL model (out-of-core, one batch of whole Root trees at a time)
+                check_exact=True, check_row_order=True, check_column_order=True
+            )
+
+    with TemporaryDirectory() as tmp_dir:
+        for mvp_model, rows_per_group in ((example_mvp, 3), (unit_test_aa_mvp, 5_000), (unit_test_cc_mvp, 5_000)):
+            df: pl.DataFrame = pl.read_parquet(mvp_model).pipe(expand_model).collect().pipe(gen_hash_keys)
+            index: pl.DataFrame = write_model(df, f"{tmp_dir}/{mvp_model}", rows_per_group=rows_per_group)
+            assert index.equals(pl.read_parquet(f"{tmp_dir}/{Path(mvp_model).stem}.index.parquet"))
+            assert db.sql(f"""
+                SELECT row_group_id, CAST(stats_min_value AS UINTEGER) AS {cstart} FROM parquet_metadata('{tmp_dir}/{mvp_model}')
+                WHERE path_in_schema = '{cstart}' ORDER BY row_group_id;
+            """).pl().get_column(cstart).equals(index.unique(subset="cGroup", keep="first", maintain_order=True).get_column(cstart))
+            # every row group opens on a Root tree
+            assert_frame_equal(pl.read_parquet(f"{tmp_dir}/{mvp_model}"), df, check_exact=True, check_row_order=True, check_column_order=True)
+            for at, size in df.filter(pl.col(cdepth).eq(1)).select(cstart, csize).gather_every(97).iter_rows():
+                assert read_subtree(f"{tmp_dir}/{mvp_model}", at).equals(df.slice(offset=at, length=size))
+            for head, tree_key, start, stop, _ in index.gather_every(11).iter_rows():
+                assert read_subtree(f"{tmp_dir}/{mvp_model}", head, by=chead).equals(df.slice(offset=start, length=stop - start))
+                assert read_subtree(f"{tmp_dir}/{mvp_model}", tree_key, by=hk_kvp_treekey).equals(df.slice(offset=start, length=stop - start))
+
+    for mvp_model, this_node in ((example_mvp, "E"), (unit_test_cc_mvp, {"type": 99, "obj": "kX"})):
+        df: pl.DataFrame = pl.read_parquet(mvp_model).pipe(expand_model).collect()
+        con = register_model(df, db.connect())
+        subtrees: pl.DataFrame = pl.concat(df.slice(offset=Δ, length=囗) for Δ, 囗 in df.filter(pl.col(ctail).eq(this_node)).select(cstart, csize).iter_rows())
+        assert_frame_equal(
+            con.execute("SELECT * FROM subtree(?);", [this_node]).pl(),
+            subtrees.select(~cs_ptr),
+            check_exact=True, check_row_order=True, check_column_order=True
+        )
+        assert_frame_equal(
+            con.execute("SELECT * FROM ancestors(?);", [this_node]).pl(),
+            df.select(~cs_ptr)[gen_ancestors(df, pl.Series([this_node]), by=ctail).explode(cptr).get_column(cptr).drop_nulls()],
+            check_exact=True, check_row_order=True, check_column_order=True
+        )
+        for d in (0, 1, 2):
+            assert_frame_equal(
+                con.execute("SELECT * FROM descendants_at_depth(?, ?);", [this_node, d]).pl(),
+                pl.concat(
+                    df.slice(offset=Δ, length=囗).filter(pl.col(cdepth).eq(depth + d))
+                    for Δ, 囗, depth in df.filter(pl.col(ctail).eq(this_node)).select(cstart, csize, cdepth).iter_rows()
+                ).select(~cs_ptr),
+                check_exact=True, check_row_order=True, check_column_order=True
+            )
+        settings: list = con.execute("SELECT name, value FROM duckdb_settings() ORDER BY name").fetchall()
+        assert register_model(df, con, name='my "model"', ptr=True).execute("SELECT * FROM subtree(?);", [this_node]).pl().equals(subtrees)
+        # with ptr=True the p### columns are registered too, under a name that needs quoting
+        assert con.execute("SELECT name, value FROM duckdb_settings() ORDER BY name").fetchall() == settings
+
+    for mvp_model, rows_per_partition in ((example_mvp, 3), (unit_test_bb_mvp, 5_000)):
+        for source in (pl.read_parquet(mvp_model), mvp_model):
+            assert_frame_equal(
+                pl.read_parquet(mvp_model).pipe(expand_model).collect(),
+                # from MVP to FULL model
+                expand_model_parallel(source, max_workers=2, rows_per_partition=rows_per_partition).collect(),
+                # from MVP to FULL model (one Root aligned partition per worker process, a Parquet path is sliced by the workers)
+                check_exact=True, check_row_order=True, check_column_order=True
+            )
+
+    for mvp_model, this_node, no_node in (
+        (example_mvp, "E", "no such label"),
+        (unit_test_cc_mvp, {"type": 99, "obj": "kX"}, {"type": -1, "obj": "no such label"})
+    ):
+        df: pl.DataFrame = pl.read_parquet(mvp_model).pipe(expand_model).collect().pipe(gen_hash_keys)
+        tree_index = TreeIndex(df)
+        assert_frame_equal(
+            pl.concat(tree_index.subtrees(this_node)),
+            pl.concat(df.slice(offset=Δ, length=囗) for Δ, 囗 in df.filter(pl.col(ctail).eq(this_node)).select(cstart, csize).iter_rows()),
+            check_exact=True, check_row_order=True, check_column_order=True
+        )
+        assert all(
+            tree_index.subtrees(hk, by=hk_ptr)[0].equals(df.slice(offset=Δ, length=囗))
+            for hk, Δ, 囗 in df.select(hk_ptr, cstart, csize).head(1_000).iter_rows()
+        )
+        assert tree_index.lookup(df.get_column(ctail)).height == df.group_by(ctail).len().get_column("len").pow(2).sum()
+        assert tree_index.runs(no_node) == () and tree_index.lookup(pl.Series([no_node, None])).height == 0
+        with TemporaryDirectory() as tmp_dir, TreeStore.write(df, f"{tmp_dir}/model.arrow") as tree_store:
+            assert_frame_equal(tree_store.model, df, check_exact=True, check_row_order=True, check_column_order=True)
+            assert all(
+                tree_store.runs(label) == tree_index.runs(label) and tree_store.slice(Δ).equals(df.slice(offset=Δ, length=囗))
+                for label, Δ, 囗 in df.select(ctail, cstart, csize).gather_every(53).iter_rows()
+            )
+            assert_frame_equal(pl.concat(TreeStore(f"{tmp_dir}/model.arrow").subtrees(this_node)), pl.concat(tree_index.subtrees(this_node)))
+            # reopened, the store maps the same files
+            assert tree_store.runs(no_node) == () and tree_store.runs(None) == ()
+        assert tree_store.model.is_empty()
+
+    for mvp_model in (example_mvp, unit_test_aa_mvp, unit_test_cc_mvp):
+        df: pl.DataFrame = pl.read_parquet(mvp_model).pipe(expand_model).collect()
+        pairs: pl.DataFrame = (
+            df.select(pl.col(cstart).alias("x")).join(df.select(pl.col(cstart).alias("y")), how="cross")
+            if df.height < 100 else
+            pl.DataFrame({"x": pl.int_range(5_000, eager=True).hash(1) % df.height, "y": pl.int_range(5_000, eager=True).hash(2) % df.height})
+            .with_columns(pl.when(pl.int_range(pl.len()).mod(2).eq(0)).then(pl.col("x").add(pl.int_range(pl.len()).mod(60)).clip(0, df.height - 1)).otherwise("y").alias("y"))
+            # every other pair close together, mostly in one Root
+        ).with_columns(pl.col("x", "y").cast(dtype=pl.UInt32))
+        lca: pl.DataFrame = (
+            # reference: the deepest ancestor of x whose [cStart, cStop) holds y
+            gen_ancestors(df, pairs.get_column("x"), include_self=True)
+            .with_columns(pairs.get_column("y"))
+            .with_row_index("xWS_Query")
+            .explode(cptr)
+            .join(df.select(pl.col(cstart).alias(cptr), pl.col(cstop).alias("xWS_Stop")), on=cptr, how="left", maintain_order="left")
+            .group_by("xWS_Query", maintain_order=True)
+            .agg(pl.col(cptr).filter(pl.col(cptr).le(pl.col("y")) & pl.col("xWS_Stop").gt(pl.col("y"))).max())
+        )
+        assert_frame_equal(
+            pairs.select(LCAIndex(df).lca(pairs.get_column("x"), pairs.get_column("y")).struct.unnest()),
+            pairs.select(
+                pl.col("x").eq(lca.get_column(cptr)).or_(pl.col("y").eq(lca.get_column(cptr))).fill_null(False).alias("cIsLCA"),
+                pl.col("x").eq(pl.col("y")).alias("cIsUQE"),
+                lca.select(pl.concat_list(cptr).list.drop_nulls()).to_series()
+            ),
+            check_exact=True, check_row_order=True, check_column_order=True
+        )
+
+    for mvp_model in (example_mvp, unit_test_aa_mvp, unit_test_cc_mvp):
+        df: pl.DataFrame = pl.read_parquet(mvp_model).pipe(expand_model).collect()
+        assert (
+            gen_ancestors(df, df.get_column(cstart), include_self=True)
+            .with_row_index().explode(cptr)
+            .select("index", pl.lit(df.get_column(ctail)).gather(pl.col(cptr)).alias(ctail))
+            .group_by("index", maintain_order=True).agg(ctail).get_column(ctail)
+            .equals(df.select(pl.concat_list(cs_ptr).list.drop_nulls()).to_series(), check_names=False)
+        )
+        # the ancestor chains (as labels) are the p### columns
+        assert_frame_equal(
+            gen_ancestors(df, df.get_column(ctail).head(100).unique(), by=ctail).drop(ctail),
+            gen_ancestors(df, df.join(df.head(100).select(ctail).unique(), on=ctail, how="semi").get_column(cstart)),
+            check_exact=True, check_row_order=False, check_column_order=True
+        )
+
+    for mvp_model, subtree, edits in (
+        (example_mvp, pl.DataFrame({ctail: ["Q", "R", "S", "T"], cdepth: pl.Series([0, 1, 2, 3], dtype=pl.UInt32)}), (
+            (delete_subtree, (11,), {}), (delete_subtree, (0,), {}), (delete_subtree, (14,), {}),
+            (insert_subtree, (), {"parent": 11}), (insert_subtree, (), {"parent": 0, "position": 4}), (insert_subtree, (), {"position": 0}),
+            (move_subtree, (11,), {}), (move_subtree, (8,), {"parent": 2}), (move_subtree, (15,), {"parent": 19}), (move_subtree, (1,), {"parent": 8})
+        )),
+        (unit_test_cc_mvp, pl.read_parquet(unit_test_cc_mvp).slice(offset=0, length=pl.read_parquet(unit_test_cc_mvp).pipe(expand_model).collect().item(0, csize)), (
+            (delete_subtree, (1,), {}), (insert_subtree, (), {"parent": 3}), (move_subtree, (1,), {"parent": 40_000})
+        ))
+    ):
+        df: pl.DataFrame = pl.read_parquet(mvp_model).pipe(expand_model, vis=True).collect()
+        for edit, args, kwargs in edits:
+            edited: pl.DataFrame = df.pipe(edit, *(args or (subtree,)), **kwargs)
+            assert_frame_equal(
+                edited,
+                edited.select(cs_ptr, ~(cs_ptr | cs_vis | cs_core_12)).pipe(expand_model, vis=True).collect(),
+                # the splice matches a full rebuild of the edited tree
+                check_exact=True, check_row_order=True, check_column_order=True
+            )
+
+    for mvp_model in (example_mvp, unit_test_aa_mvp, unit_test_cc_mvp):
+        df: pl.DataFrame = pl.read_parquet(mvp_model).pipe(expand_model).collect()
+        for cut in df.filter(pl.col(cdepth).eq(0)).get_column(cstart).gather([1, -1]):
+            assert_frame_equal(
+                pl.read_parquet(mvp_model).head(cut).pipe(expand_model).collect().pipe(gen_hash_keys)
+                .pipe(append_trees, pl.read_parquet(mvp_model).slice(offset=cut)),
+                # only the Root trees after the cut are expanded (and hashed) when appended
+                df.pipe(gen_hash_keys),
+                check_exact=True, check_row_order=True, check_column_order=True
+            )
+
+    mvp: pl.DataFrame = pl.read_parquet(example_mvp)
+    mvp_enum: pl.DataFrame = mvp.with_columns(pl.col(ctail).cast(dtype=pl.Enum(mvp.get_column(ctail).unique().sort())))
+    cut: int = mvp.select(pl.col(cdepth).eq(0).arg_true().get(1)).item()
+    assert_frame_equal(
+        mvp_enum.head(cut).pipe(expand_model).collect().pipe(append_trees, mvp.slice(offset=cut)),
+        # String labels are cast to the categories of an Enum model
+        mvp_enum.pipe(expand_model).collect(),
+        check_exact=True, check_row_order=True, check_column_order=True
+    )
+    for model, new_trees in (
+        (mvp_enum.head(cut), mvp.slice(offset=cut).with_columns(pl.lit("no such label").alias(ctail))),
+        (mvp.head(cut), mvp_enum.slice(offset=cut))
+    ):
+        try:
+            model.pipe(expand_model).collect().pipe(append_trees, new_trees)
+            raise ValueError("append_trees spliced labels of another dtype")
+        except AssertionError as error:
+            assert "labels" in str(error)
+
+    for mvp_model in (example_mvp, unit_test_aa_mvp, unit_test_cc_mvp):
+        df: pl.DataFrame = pl.read_parquet(mvp_model).pipe(expand_model, vis=True).collect()
+        for keep_ptr, vis in ((False, True), (True, True), (False, False)):
+            assert_frame_equal(
+                df.pipe(compact_model, keep_ptr=keep_ptr).pipe(restore_model, vis=vis).collect(),
+                df.clone().pipe(use_enums, maintain_order=True).select(cs.all() if vis else ~cs_vis),
+                check_exact=True, check_row_order=True, check_column_order=True
+            )
+        assert df.estimated_size() > 2 * df.pipe(compact_model).estimated_size()
+
+    for mvp_model in (example_mvp, unit_test_aa_mvp, unit_test_bb_mvp, unit_test_cc_mvp):
+        df: pl.DataFrame = pl.read_parquet(mvp_model).pipe(expand_model).collect()
+        shared, pool = share_subtrees(df)
+        assert_frame_equal(
+            expand_shared(shared, pool).collect(),
+            df,
+            check_exact=True, check_row_order=True, check_column_order=True
+        )
+        assert shared.height + pool.height < df.height or mvp_model == example_mvp
+        # example_mvp repeats no subtree of two rows or more
+    assert share_subtrees(df, min_size=df.height)[1].is_empty()
+
+    for mvp_model in (example_mvp, unit_test_aa_mvp, unit_test_cc_mvp):
+        df: pl.DataFrame = pl.read_parquet(mvp_model).pipe(expand_model, vis=True).collect()
+        assert not cs.expand_selector(pl.read_parquet(mvp_model).pipe(expand_model).collect(), cs_vis)
+        for offset, length in ((0, None), (0, 50), (11, 9), (df.height // 2, 50), *df.filter(pl.col(cdepth).eq(2)).select(cstart, csize).head(5).iter_rows()):
+            assert_frame_equal(
+                df.select(~cs_vis).pipe(render_model, offset=offset, length=length),
+                df.slice(offset=offset, length=length),
+                # a window (or subtree) renders as it does in the whole model
+                check_exact=True, check_row_order=True, check_column_order=True
+            )
+
+    for mvp_model in (example_mvp, unit_test_aa_mvp, unit_test_cc_mvp):
+        df: pl.DataFrame = pl.read_parquet(mvp_model).pipe(expand_model).collect()
+        for columns in ((cstart, cstop, cdepth), (cwidth,), (csize,), (cright,), (chead, cis_root), (cout, cleft), (cstart,)):
+            assert_frame_equal(
+                pl.read_parquet(mvp_model).pipe(expand_model, columns=columns).collect(),
+                df.select(~(cs_core_12 - cs.by_name(*columns))),
+                # only the requested core columns are built, in core column order
+                check_exact=True, check_row_order=True, check_column_order=True
+            )
+
+    for mvp_model in (example_mvp, unit_test_aa_mvp, unit_test_cc_mvp):
+        df: pl.DataFrame = pl.read_parquet(mvp_model).pipe(expand_model).collect().with_columns(
+            pl.when(pl.col(cout).ne(1)).then(pl.int_range(pl.len()).hash(7).mod(1_000).cast(dtype=pl.Int64)).alias("user_value9")
+        )
+        # cOut == 1 rows are NULL, so a chain of them has no values
+        assert_frame_equal(
+            df.pipe(subtree_aggregate, {"user_value9": ("sum", "count", "mean", "min", "max")}).select(cs.starts_with("user_value9_")),
+            # reference: the cStart range join, one row per (ancestor, descendant) pair
+            df.lazy().select(pl.col(cstart, cstop).name.prefix("P_"))
+            .join_where(df.lazy().select(cstart, "user_value9"), pl.col(cstart) >= pl.col("P_" + cstart), pl.col(cstart) < pl.col("P_" + cstop))
+            .group_by("P_" + cstart)
+            .agg(*(getattr(pl.col("user_value9"), op)().alias(f"user_value9_{op}") for op in ("sum", "count", "mean", "min", "max")))
+            .sort("P_" + cstart).drop("P_" + cstart).collect(),
+            check_exact=True, check_row_order=True, check_column_order=True, check_dtypes=False
+        )
+
+    df: pl.DataFrame = pl.read_parquet(example_mvp).pipe(expand_model).collect()
+    assert_frame_equal(
+        df.pipe(subtree_aggregate, {"user_value1": ("sum", "mean"), "user_value2": ("sum", "mean")}).select(cs.matches("^user_value[12]_")),
+        # Float values of ~1e16: the reference sums each subtree's own rows only
+        df.lazy().select(pl.col(cstart, cstop).name.prefix("P_"))
+        .join_where(df.lazy().select(cstart, "user_value1", "user_value2"), pl.col(cstart) >= pl.col("P_" + cstart), pl.col(cstart) < pl.col("P_" + cstop))
+        .group_by("P_" + cstart)
+        .agg(*(getattr(pl.col(col), op)().alias(f"{col}_{op}") for col in ("user_value1", "user_value2") for op in ("sum", "mean")))
+        .sort("P_" + cstart).drop("P_" + cstart).collect(),
+        check_exact=False, rtol=1e-12, check_row_order=True, check_column_order=True
+    )
+    assert pl.DataFrame(
+        {ctail: ["r", "a", "b", "c"], cdepth: pl.Series([0, 1, 1, 1], dtype=pl.UInt32), "user_value9": [1e17, 1.0, 3.0, 1.0]}
+    ).pipe(expand_model).collect().pipe(subtree_aggregate, {"user_value9": ("sum",)}).get_column("user_value9_sum").to_list()[1:] == [1.0, 3.0, 1.0]
+    # a running total would cancel the leaves under the large Root to 0.0
+
+    for mvp_model in (example_mvp, unit_test_aa_mvp, unit_test_cc_mvp):
+        df: pl.DataFrame = pl.read_parquet(mvp_model).pipe(expand_model).collect().with_columns(
+            pl.when(pl.col(cout).ne(1)).then(pl.int_range(pl.len()).hash(7).mod(5).add(1).cast(dtype=pl.Int64)).alias("user_value9")
+        )
+        for include_self in (True, False):
+            path: pl.DataFrame = (
+                # reference: one row per (node, ancestor) pair
+                gen_ancestors(df, df.get_column(cstart), include_self=include_self)
+                .with_row_index("xWS_Query")
+                .explode(cptr)
+                .join(df.select(pl.col(cstart).alias(cptr), "user_value9"), on=cptr, how="left", maintain_order="left")
+            )
+            for op in ("sum", "prod", "min", "max"):
+                assert_frame_equal(
+                    df.pipe(path_accumulate, "user_value9", op, include_self=include_self).select(f"user_value9_path_{op}"),
+                    path.group_by("xWS_Query", maintain_order=True).agg(
+                        pl.when(pl.col("user_value9").is_not_null().any())
+                        .then(getattr(pl.col("user_value9"), {"prod": "product"}.get(op, op))())
+                        .alias(f"user_value9_path_{op}")
+                    ).drop("xWS_Query"),
+                    check_exact=True, check_row_order=True, check_column_order=True
+                )
+
+    for mvp_model in (example_mvp, unit_test_aa_mvp, unit_test_bb_mvp, unit_test_cc_mvp):
+        assert validate_model(pl.read_parquet(mvp_model)).is_empty()
+        assert validate_model(pl.read_parquet(mvp_model).pipe(expand_model).collect().select(cs_ptr)).is_empty()
+
+    df: pl.DataFrame = pl.read_parquet(example_mvp).pipe(expand_model).collect().select(cs_ptr)
+    assert_frame_equal(
+        pl.concat((df.slice(0, 5), df.slice(8, 3), df.slice(5, 3), df.slice(11), df.slice(2, 2), df.slice(2, 2))).pipe(validate_model),
+        pl.DataFrame(
+            {"issue": ["not_colocated", "not_colocated", "orphan", "not_colocated", "duplicate"], cstart: [5, 8, 11, 20, 21], cstop: [6, 9, 12, 21, 24]},
+            schema_overrides={cstart: pl.UInt32, cstop: pl.UInt32}
+        ),
+        check_exact=True, check_row_order=True, check_column_order=True
+    )
+    assert validate_model(df.with_columns(pl.when(pl.int_range(pl.len()).eq(3)).then(None).otherwise(cs.by_index(0)).name.keep())).rows() == [("gap", 3, 4), ("not_colocated", 4, 5)]
+    assert validate_model(pl.read_parquet(example_mvp).pipe(lambda mvp: pl.concat((mvp.slice(1), mvp.slice(0, 3))))).rows() == [("orphan", 0, 1)]
+    assert validate_model(pl.read_parquet(example_mvp).pipe(lambda mvp: pl.concat((mvp, mvp.slice(0, 3))))).rows() == [("duplicate", 20, 23)]
+    try:
+        df.reverse().pipe(expand_model, verify_first_n=10).collect()
+        raise ValueError("verify_first_n accepted rows not colocated correctly")
+    except AssertionError as error:
+        assert "not_colocated" in str(error)
+
+    df: pl.DataFrame = pl.read_parquet(unit_test_aa_mvp).pipe(expand_model, vis=True).collect().pipe(gen_hash_keys)
+    with profile_stages() as stage_records:
+        assert_frame_equal(
+            pl.read_parquet(unit_test_aa_mvp).pipe(expand_model, vis=True).collect().pipe(gen_hash_keys),
+            # profiled, every stage is collected at its boundary
+            df,
+            check_exact=True, check_row_order=True, check_column_order=True
+        )
+    assert [record["stage"] for record in stage_records] == [
+        "expand_model:mvp_to_flat", "expand_model:labels", "expand_model:bounds", "expand_model:derived", "expand_model:vis",
+        "gen_hash_keys:tree_keys", "gen_hash_keys:progeny", "gen_hash_keys:keys"
+    ]
+    assert all(record["rows_in"] == record["rows_out"] == df.height and record["plan"] for record in stage_records[:5])
+
+    hash_keys_by_permutation: dict[int, pl.DataFrame] = {
+        permutation_id: df.drop("PERMUTATION_ID").pipe(gen_hash_keys, trees=True)
+        for (permutation_id,), df in pl.read_parquet(example_full_many_permutations).partition_by("PERMUTATION_ID", as_dict=True).items()
+    }
+    assert all(
+        df.select(pl.all_horizontal(pl.col(hk_schema, hk_nspace, hk_schema_tree, hk_nspace_tree).is_null().eq(pl.col("cIsLeaf"))).all()).item()
+        for df in hash_keys_by_permutation.values()
+    )
+    assert all(
+        df.select(hk_ptr, hk_schema, hk_nspace, hk_schema_tree, hk_nspace_tree).sort(pl.all())
+        .equals(hash_keys_by_permutation[0].select(hk_ptr, hk_schema, hk_nspace, hk_schema_tree, hk_nspace_tree).sort(pl.all()))
+        for df in hash_keys_by_permutation.values()
+    )
+    # the Progeny and tree digests ignore Root and sibling order
+
+    for mvp_model in (example_mvp, unit_test_aa_mvp, unit_test_cc_mvp):
+        df: pl.DataFrame = pl.read_parquet(mvp_model).pipe(expand_model).collect()
+        progeny: pl.DataFrame = (
+            # reference: the sorted Progeny sizes and the sorted set of normalized Progeny labels, from a range join
+            df.lazy().select(pl.col(cstart, cstop).name.prefix("P_"))
+            .join_where(
+                df.lazy().select(
+                    cstart, pl.col(cstop).sub(cstart).alias("xWS_Size"),
+                    pl.col(ctail).cast(dtype=pl.Utf8).str.to_lowercase().str.replace_all(r"""[\s"'`]""", "").alias("xWS_Label")
+                ),
+                pl.col(cstart) > pl.col("P_" + cstart), pl.col(cstart) < pl.col("P_" + cstop)
+            )
+            .group_by(pl.col("P_" + cstart).alias(cstart))
+            .agg(pl.col("xWS_Size").sort(), pl.col("xWS_Label").unique().sort())
+            .collect()
+        )
+        df: pl.DataFrame = df.pipe(gen_hash_keys).join(progeny, on=cstart, how="left")
+        for digest, reference in ((hk_schema, "xWS_Size"), (hk_nspace, "xWS_Label")):
+            assert df.select(pl.col(digest).is_null().eq(pl.col(reference).is_null()).all()).item()
+            assert df.get_column(digest).n_unique() == df.get_column(reference).n_unique() == df.select(pl.struct(digest, reference).n_unique()).item()
+        # hkSchema is the multiset of Progeny sizes and hkNSpace the set of normalized Progeny labels: one digest per reference value
+
     print(f"\n\nNO ERRORS detected\n\n")
@@ -1,13 +1,26 @@
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import count
+from io import BytesIO
 from json import loads
+from multiprocessing import get_context
+from os import cpu_count
+from pathlib import Path
+from time import perf_counter
 import polars as pl
 import polars.selectors as cs
 import polars_hash as plh
 
 chead, ctail, cdepth, cstart, cstop = "cHead", "cTail", "cDepth", "cStart", "cStop"
 hk_ptr, hk_ptr_parent, hk_schema, hk_nspace, hk_kvp_treekey = "hkPTR", "hkPTR_alParent", "hkSchema", "hkNSpace", "hkKVP_TreeKey"
+hk_schema_tree, hk_nspace_tree = "hkSchemaTree", "hkNSpaceTree"
+hk_iso = "hkIso"
 csize, cwidth, cout = "cSize", "cWidth", "cOut"
 cleft, cright, cis_root, cis_leaf = "cLeft", "cRight", "cIsRoot", "cIsLeaf"
 cptr, cparent, cchild, cbkey = "cPTR", "cParent", "cChild", "cBKey"
+cref, cgroup = "cRef", "cGroup"
 vis_open, vis_closed, vis_pipe, vis_void = (
     pl.lit(value=" ╠══➤ ", dtype=pl.String), pl.lit(value=" ╚══➤ ", dtype=pl.String),
     pl.lit(value=" ║   ", dtype=pl.String), pl.lit(value="  ", dtype=pl.String)
@@ -18,13 +31,72 @@ cs_ptr = cs.matches(pattern="^p\\d{3}_[1-9]\\d*$")
 cs_vis = cs.matches(pattern="^v\\d{3}_[1-9]\\d*$")
 _core_12 = (chead, ctail, cdepth, cstart, cstop, csize, cwidth, cout, cleft, cright, cis_root, cis_leaf)
 cs_core_12 = cs.by_name(*_core_12, require_all=False)
-cs_hash = cs.by_name(hk_ptr, hk_ptr_parent, hk_schema, hk_nspace, hk_kvp_treekey, require_all=False)
+_core_deps = {
+    chead: (), ctail: (), cdepth: (), cstart: (), cstop: (cstart,), cwidth: (), cout: (),
+    csize: (cstart, cstop), cleft: (cstart, cdepth), cright: (cstop, cdepth), cis_root: (cdepth,), cis_leaf: (cstart, cstop)
+}
+# the core columns each core column is computed from (expand_model(columns=...) builds only the closure)
+cs_hash = cs.by_name(hk_ptr, hk_ptr_parent, hk_schema, hk_nspace, hk_kvp_treekey, hk_schema_tree, hk_nspace_tree, hk_iso, require_all=False)
 cs_uqu = (
     cs.starts_with("uq") &
     cs.by_dtype(pl.Struct({"cIsLCA": pl.Boolean, "cIsUQE": pl.Boolean, cptr: pl.List(_sys_dtype)}))
 )
 
 
+_profiles: list[tuple[list[dict], bool, Callable[[dict], None] | None]] = []
+# the active profile_stages contexts, innermost last
+
+
+@contextmanager
+def profile_stages(*, explain: bool = True, callback: Callable[[dict], None] = None) -> Iterator[list[dict]]:
+    """
+    Records every logical stage of expand_model, refine_model, from_mALPC and gen_hash_keys run inside the
+    context: its wall time, rows in and out, peak memory growth (the process high-water mark, Unix only)
+    and, with explain, the optimized plan. Records are appended to the yielded list and also passed to
+    callback, if given. While profiling, each stage is collected at its boundary so it can be measured;
+    outside the context the stages stay one lazy query and cost nothing.
+    """
+    records: list[dict] = []
+    _profiles.append((records, explain, callback))
+    try:
+        yield records
+    finally:
+        _profiles.pop()
+
+
+def _stage_mark() -> tuple[float, int] | None:
+    # the start of a stage that is computed eagerly (before _stage is called on its result)
+    if not _profiles:
+        return None
+    from resource import getrusage, RUSAGE_SELF
+    return perf_counter(), getrusage(RUSAGE_SELF).ru_maxrss
+
+
+def _stage(name: str, ingest: pl.DataFrame | pl.LazyFrame, source: pl.DataFrame | pl.LazyFrame, /, *, mark: tuple[float, int] = None) -> pl.DataFrame | pl.LazyFrame:
+    # when profile_stages is active: collects ingest (timed from mark, if the stage started earlier) and records
+    # it; otherwise returns ingest untouched. Returns the same kind of frame it was given.
+    if not _profiles:
+        return ingest
+    from resource import getrusage, RUSAGE_SELF
+
+    rows_in: int = source.height if isinstance(source, pl.DataFrame) else source.select(pl.len()).collect().item()
+    plan: str | None = ingest.explain(optimized=True) if isinstance(ingest, pl.LazyFrame) and any(explain for _, explain, _ in _profiles) else None
+    started, peak_before = mark or _stage_mark()
+    collected: pl.DataFrame = ingest.lazy().collect()
+
+    record: dict = {
+        "stage": name, "seconds": perf_counter() - started, "rows_in": rows_in, "rows_out": collected.height,
+        "peak_mib": (getrusage(RUSAGE_SELF).ru_maxrss - peak_before) / 1024, "plan": plan
+        # ru_maxrss is in KiB on Linux
+    }
+    for records, explain, callback in _profiles:
+        records.append(record if explain else record | {"plan": None})
+        if callback:
+            callback(records[-1])
+
+    return collected.lazy() if isinstance(ingest, pl.LazyFrame) else collected
+
+
 def tree_hook(ingest: dict | str | pl.DataFrame | pl.LazyFrame, /) -> dict[str, bool]:
 
     _schema_hook: dict = {
@@ -47,7 +119,7 @@ def tree_hook(ingest: dict | str | pl.DataFrame | pl.LazyFrame, /) -> dict[str,
     return {kk: _schema_hook[kk](ingest) for kk in _schema_hook}
 
 
-def use_enums(ingest: pl.DataFrame, /, *, namespace_map: dict[str, str] = None) -> pl.DataFrame:
+def use_enums(ingest: pl.DataFrame, /, *, namespace_map: dict[str, str] = None, maintain_order: bool = False) -> pl.DataFrame:
 
     if not namespace_map and ingest.schema[ctail] == pl.String:
         namespace_map: dict = {ptr_column: ctail for ptr_column in
@@ -59,8 +131,10 @@ def use_enums(ingest: pl.DataFrame, /, *, namespace_map: dict[str, str] = None)
         assert all(vv in namespace_map.keys() for vv in namespace_map.values())
         assert all(ingest.schema[kk] == pl.String for kk in namespace_map.keys())
         namespace: dict[str, pl.Enum] = {
-            col: pl.Enum(ingest.get_column(col).unique()) for col in namespace_map.values()
+            col: pl.Enum(ingest.get_column(col).unique(maintain_order=True) if maintain_order else ingest.get_column(col).unique().sort())
+            for col in namespace_map.values()
         }
+        # ↑↑↑ sorted categories, or in order of first appearance (compact_model) so that codes follow pre-order
 
         for idx, col in enumerate(ingest.columns):
             if col in namespace_map:
@@ -72,7 +146,208 @@ def use_enums(ingest: pl.DataFrame, /, *, namespace_map: dict[str, str] = None)
     return ingest
 
 
-def gen_hash_keys(ingest: pl.DataFrame, /, *, as_uint64: bool = True) -> pl.DataFrame:
+def compact_model(ingest: pl.DataFrame, /, *, keep_ptr: bool = False) -> pl.DataFrame:
+    """
+    Shrinks a FULL model to what cannot be derived cheaply: cHead, cTail, cDepth, cStart, cStop, cWidth and
+    cOut (the mI05 columns, plus the two that need a group by), and the user columns. cDepth, cWidth and cOut
+    take the narrowest unsigned dtype that fits, String labels share one Enum dictionary (see use_enums) with
+    its categories in order of first appearance, and the p### (unless keep_ptr) and v### columns are dropped.
+    restore_model derives the rest on demand.
+    """
+    assert len(cs.expand_selector(ingest, cs_core_12)) == 12
+
+    narrow: dict[str, pl.DataType] = {
+        col: next(dtype for dtype, bits in ((pl.UInt8, 8), (pl.UInt16, 16), (pl.UInt32, 32), (pl.UInt64, 64)) if (value or 0) < 2 ** bits)
+        for col, value in ingest.select(pl.col(cdepth, cwidth, cout).max()).row(0, named=True).items()
+    }
+
+    return ingest.select(
+        cs_ptr if keep_ptr else cs.by_name(),
+        chead, ctail, pl.col(cdepth).cast(dtype=narrow[cdepth]), cstart, cstop,
+        pl.col(cwidth).cast(dtype=narrow[cwidth]), pl.col(cout).cast(dtype=narrow[cout]),
+        ~(cs_ptr | cs_vis | cs_core_12)
+    ).pipe(use_enums, maintain_order=True)
+
+
+def restore_model(ingest: pl.DataFrame | pl.LazyFrame, /, *, vis: bool = False, vis_all: bool = False) -> pl.LazyFrame:
+    """
+    Restores a FULL model from compact_model: the p### and v### columns and the derived core columns are
+    built again from cTail, cDepth, cStart and cStop, and the narrowed integer columns are widened back.
+    Labels keep their Enum dtype. As with expand_model, the v### columns are only rendered with vis=True.
+    """
+    going_from_roots_down_to_the_leaves: range = range(
+        len(cs.expand_selector(ingest, cs_ptr)) if cs.expand_selector(ingest, cs_ptr)
+        else (ingest.lazy().select(pl.col(cdepth)).max().collect().to_series().item(0) + 1)
+    )
+    build_cvis_a, build_cvis_b = _build_cvis(going_from_roots_down_to_the_leaves[::-1], vis_all=vis_all) if vis else ((), ())
+
+    return (
+        ingest
+        .lazy()
+        .pipe(lambda Δ: Δ if cs.expand_selector(Δ, cs_ptr) else _from_mvp_to_flat(Δ, going_from_roots_down_to_the_leaves))
+        .with_columns(pl.col(cdepth, cwidth, cout).cast(dtype=_sys_dtype))
+        .with_columns(
+            pl.col(cstop).sub(cstart).alias(csize),
+            pl.col(cdepth).eq(0).alias(cis_root),
+            pl.col(cstop).sub(cstart).eq(1).alias(cis_leaf),
+            pl.col(cstart).mul(2).sub(cdepth).add(1).cast(dtype=_sys_dtype).alias(cleft),
+            pl.col(cstop).mul(2).sub(cdepth).cast(dtype=_sys_dtype).alias(cright),
+            *build_cvis_a[::-1]
+        )
+        .with_columns(*build_cvis_b)
+        .select(
+            cs_ptr, cs_vis, *_core_12, cs_hash, cs_uqu,
+            ~(cs_ptr | cs_vis | cs_core_12 | cs_hash | cs_uqu)
+        )
+    )
+
+
+def share_subtrees(ingest: pl.DataFrame, /, *, min_size: int = 2) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """
+    Stores a FULL model with every repeated subtree kept once (hash consing). Returns (shared, pool): pool
+    holds one canonical copy of each repeated subtree (cRef, then cTail, cDepth relative to its Root and
+    the user columns), shared holds the MVP rows outside those subtrees, and each occurrence is a single row
+    carrying its cDepth and cRef (its cTail and user columns live in pool). Only the highest occurrences of
+    at least min_size rows, repeated at least twice, are shared. Two subtrees are identical when their
+    labels, user values, shape and sibling order all are, so expand_shared rebuilds the model exactly (the
+    hash keys and v### columns are not stored, regenerate them after).
+    """
+    assert min_size >= 2
+    user_cols: tuple[str, ...] = tuple(cs.expand_selector(ingest, ~(cs_ptr | cs_vis | cs_core_12 | cs_hash | cs_uqu)))
+    sep, ws_parent, ws_token, ws_digest, ws_key, ws_canon = "|", "xWS_Parent", "xWS_Token", "xWS_Digest", "xWS_Key", "xWS_Canon"
+
+    nodes_by_depth: dict[int, pl.DataFrame] = {
+        depth: frame for (depth,), frame in
+        _with_parent(ingest)
+        .select(cdepth, cstart, ws_parent, pl.struct(ctail, *user_cols).hash().alias(ws_token))
+        .collect()
+        .partition_by(cdepth, as_dict=True, include_key=False, maintain_order=True).items()
+    }
+
+    progeny: list[pl.DataFrame] = [pl.DataFrame(schema={cstart: _sys_dtype, ws_digest: pl.UInt64})]
+    for ascent in sorted(nodes_by_depth)[:0:-1]:
+        # one token per child (label and user values, digest of its own children) in pre-order, so unlike the
+        # tree digests of gen_hash_keys, sibling order and letter case count; leaves have no digest (0)
+        progeny.append(
+            nodes_by_depth[ascent]
+            .join(progeny[-1], on=cstart, how="left", maintain_order="left")
+            .group_by(ws_parent, maintain_order=True)
+            .agg((pl.concat_str(ws_token, pl.col(ws_digest).fill_null(0), separator=":").str.join(sep)).nchash.xxhash64().alias(ws_digest))
+            .rename({ws_parent: cstart})
+        )
+    progeny: pl.DataFrame = pl.concat(progeny, how="vertical")
+
+    candidates: pl.DataFrame = (
+        pl.concat((frame for frame in nodes_by_depth.values()), how="vertical")
+        .join(progeny, on=cstart, how="left")
+        .join(ingest.select(cstart, cstop, cdepth), on=cstart, how="inner")
+        .sort(cstart)
+        .with_columns(pl.concat_str(ws_token, pl.col(ws_digest).fill_null(0), pl.col(cstop).sub(cstart), separator=":").nchash.xxhash64().alias(ws_key))
+        .filter(pl.col(cstop).sub(cstart).ge(min_size) & pl.len().over(ws_key).ge(2))
+        .with_columns(pl.col(cstart).first().over(ws_key).alias(ws_canon))
+    )
+    occurrences: pl.DataFrame = (
+        candidates
+        .filter(pl.col(cstop).cum_max().shift(1).fill_null(0).le(pl.col(cstart)))
+        # ↑↑↑ candidate ranges are nested or disjoint, so one inside an earlier candidate starts before its running cStop
+        .filter(pl.len().over(ws_key).ge(2))
+        .select(
+            cstart, cstop, ws_canon,
+            pl.col(cdepth).cast(dtype=pl.Int64).sub(pl.lit(ingest.get_column(cdepth)).gather(pl.col(ws_canon))).alias(cdepth),
+            pl.col(ws_canon).rank(method="dense").sub(1).cast(dtype=_sys_dtype).alias(cref)
+        )
+    )
+    # cDepth is each occurrence's depth relative to its canonical copy
+
+    ws_offset = "xWS_Offset"
+    pairs: pl.DataFrame = (
+        occurrences
+        .with_columns(pl.int_ranges(0, pl.col(cstop).sub(cstart), dtype=_sys_dtype).alias(ws_offset))
+        .explode(ws_offset)
+        .select(cref, cdepth, pl.col(cstart).add(pl.col(ws_offset)), pl.col(ws_canon).add(pl.col(ws_offset)), ws_offset)
+    )
+    rows: pl.DataFrame = ingest.select(ctail, pl.col(cdepth).cast(dtype=pl.Int64), *user_cols)
+    assert (
+        pl.concat(how="horizontal", items=(rows[pairs.get_column(cstart)], rows[pairs.get_column(ws_canon)].select(pl.all().name.suffix("_Δ"))))
+        .select(
+            pl.all_horizontal(pl.col(col).eq_missing(pl.col(col + "_Δ")) for col in (ctail, *user_cols)) &
+            pl.col(cdepth).sub(cdepth + "_Δ").eq(pairs.get_column(cdepth))
+        )
+        .to_series().all()
+    ), "Two distinct subtrees share a 64-bit digest"
+    # every occurrence is checked row by row against its canonical copy, so a collision is never shared
+
+    pool: pl.DataFrame = (
+        pairs
+        .filter(pl.col(cstart).sub(pl.col(ws_offset)).eq(pl.col(cstart).sub(pl.col(ws_offset)).first().over(cref)))
+        # ↑↑↑ the rows of the first occurrence of each cRef, read from its (verified identical) canonical copy
+        .select(
+            cref,
+            pl.lit(rows.get_column(ctail)).gather(ws_canon).alias(ctail),
+            pl.lit(rows.get_column(cdepth)).gather(ws_canon).sub(pl.lit(rows.get_column(cdepth)).gather(pl.col(ws_canon).sub(pl.col(ws_offset)))).cast(dtype=_sys_dtype).alias(cdepth),
+            *(pl.lit(rows.get_column(col)).gather(ws_canon).alias(col) for col in user_cols)
+        )
+    )
+    shared: pl.DataFrame = (
+        rows
+        .with_columns(pl.col(cdepth).cast(dtype=_sys_dtype))
+        .hstack(ingest.select(cstart))
+        .join(occurrences.select(cstart, cstop, cref), on=cstart, how="left", maintain_order="left")
+        .filter(pl.col(cstop).is_not_null() | pl.col(cstop).fill_null(strategy="forward").fill_null(0).le(pl.col(cstart)))
+        # ↑↑↑ occurrences are disjoint, a row is inside one when it starts before the last occurrence's cStop
+        .select(
+            pl.when(pl.col(cref).is_null()).then(pl.col(ctail)).alias(ctail), cdepth,
+            *(pl.when(pl.col(cref).is_null()).then(pl.col(col)).alias(col) for col in user_cols), cref
+        )
+    )
+    return shared, pool
+
+
+def expand_shared(shared: pl.DataFrame | pl.LazyFrame, pool: pl.DataFrame | pl.LazyFrame, /, *, vis: bool = False, vis_all: bool = False) -> pl.LazyFrame:
+    """
+    Rebuilds the FULL model stored by share_subtrees: each occurrence row is replaced by the rows of its
+    canonical copy in pool, shifted to its depth, and the MVP result is expanded. The join and the
+    expansion are one lazy query, so nothing is materialised until it is collected.
+    """
+    pool: pl.LazyFrame = pool.lazy()
+    return (
+        shared
+        .lazy()
+        .join(pool.select(cref, pl.all().exclude(cref).name.suffix("_Δ")), on=cref, how="left", maintain_order="left_right")
+        .select(
+            pl.coalesce(ctail, ctail + "_Δ").alias(ctail),
+            pl.col(cdepth).add(pl.col(cdepth + "_Δ").fill_null(0)).cast(dtype=_sys_dtype),
+            *(pl.coalesce(col, col + "_Δ").alias(col) for col in pool.collect_schema().names() if col not in (cref, ctail, cdepth))
+        )
+        .pipe(expand_model, vis=vis, vis_all=vis_all)
+    )
+
+
+def _with_parent(ingest: pl.DataFrame | pl.LazyFrame, /) -> pl.LazyFrame:
+    # adds xWS_Parent, the cStart of each node's parent (NULL for Roots). In pre-order a node's parent is the
+    # closest preceding node one level up, so a backward as-of join by depth finds it without a range join.
+    ws_parent, ws_depth = "xWS_Parent", "xWS_Depth"
+    return (
+        ingest
+        .lazy().set_sorted(cstart)
+        .with_columns(pl.col(cdepth).cast(dtype=pl.Int64).sub(1).alias(ws_depth))
+        .join_asof(
+            ingest.lazy().select(pl.col(cstart).alias(ws_parent), pl.col(cdepth).cast(dtype=pl.Int64).alias(ws_depth)).set_sorted(ws_parent),
+            left_on=cstart, right_on=ws_parent, by=ws_depth, strategy="backward", check_sortedness=False
+        )
+        .drop(ws_depth)
+    )
+
+
+def gen_hash_keys(ingest: pl.DataFrame, /, *, as_uint64: bool = True, trees: bool = False) -> pl.DataFrame:
+    """
+    Adds the hash key columns to a FULL model: hkPTR (the node's path), hkPTR_Parent, hkSchema (the multiset of
+    its Progeny's subtree sizes), hkNSpace (the set of its Progeny's normalized labels) and hkKVP_TreeKey (its
+    Root tree). hkSchema and hkNSpace are order-free sums of one token per member, built in one bottom-up pass;
+    their values differ from the former sorted-list hashes, so stored keys must be regenerated. With trees=True
+    the Merkle digests hkSchemaTree and hkNSpaceTree (the Progeny with its shape) are added as well.
+    Leaves have no Progeny, so their Progeny keys are NULL. as_uint64=False renders the keys as hex strings.
+    """
 
     ptr_key_cols: tuple[str, ...] = tuple(sorted(cs.expand_selector(ingest, cs_ptr)))
     going_from_roots_down_to_the_leaves: range = range(len(ptr_key_cols))
@@ -89,6 +364,7 @@ def gen_hash_keys(ingest: pl.DataFrame, /, *, as_uint64: bool = True) -> pl.Data
         hk_kvp_treekey: f"{sep}{ingest.schema[cdepth]}{sep}{ingest.schema[ctail]}".replace(sqs, sep)
     }
 
+    mark: tuple[float, int] | None = _stage_mark()
     root_nodes: pl.DataFrame = pl.concat(how="vertical", items=(
         ingest.set_sorted(cstart)
         .slice(offset=_indv_tree[cstart], length=_indv_tree[cstop]-_indv_tree[cstart])
@@ -98,75 +374,88 @@ def gen_hash_keys(ingest: pl.DataFrame, /, *, as_uint64: bool = True) -> pl.Data
             .nchash.xxhash64().alias(hk_kvp_treekey)
         ) for _indv_tree in ingest.set_sorted(cstart).filter(pl.col(cdepth).eq(0)).select(cstart, cstop).to_dicts()
     )).rechunk()
+    root_nodes: pl.DataFrame = _stage("gen_hash_keys:tree_keys", root_nodes, ingest, mark=mark)
 
-    self_range_join_no_leaves: pl.LazyFrame = (
-        #
-        # This ↓↓↓ is a Polars version of a standard SQL self-join range query (in Open form). It finds each
-        # Tree node's Progeny using **Relative** predicates. A more familiar SQL equivalent might be
-        # `FROM t AS child, t AS parent WHERE child.cstart > parent.cstart AND child.cstart < parent.cstop;`
+    ws_parent, ws_sizes, ws_labels = "xWS_Parent", "xWS_Sizes", "xWS_Labels"
+    mark: tuple[float, int] | None = _stage_mark()
+    nodes_by_depth: dict[int, pl.DataFrame] = {
+        depth: frame for (depth,), frame in
+        _with_parent(ingest)
+        .select(
+            cdepth, cstart, ws_parent,
+            pl.col(cstop).sub(cstart).cast(dtype=pl.Utf8, strict=True)
+            .alias(hk_schema),
+            pl.col(ctail).cast(dtype=pl.Utf8, strict=True)
+            .str.to_lowercase().str.replace_all(*treat_quotes_and_whitespace_zls)
+            .alias(hk_nspace)
+        )
+        .collect()
+        .partition_by(cdepth, as_dict=True, include_key=False).items()
+    }
+
+    #
+    # hkSchema is the multiset of the sizes of a node's Progeny, and hkNSpace the set of their normalized labels.
+    # Both are built as sums of one 64-bit token per member (wrapping), going from the leaves up to the roots in
+    # one child-to-parent pass: every node is read exactly once, as a child, and hands its parent its own token
+    # plus the sum of its own Progeny. A multiset simply adds up. A set must count each label once, so the
+    # distinct (parent, label token) pairs of one level are carried up to the next and deduplicated there; only
+    # one level of pairs is held at a time, and the work is linear in the number of distinct labels per subtree.
+    #
+    token: Callable[[pl.Expr, str], pl.Expr] = lambda expr, key: (expr + hk_salt[key]).nchash.xxhash64()
+    sums: list[pl.DataFrame] = [pl.DataFrame(schema={cstart: _sys_dtype, ws_sizes: pl.UInt64, hk_schema_tree: pl.UInt64, hk_nspace_tree: pl.UInt64})]
+    label_pairs: pl.DataFrame = pl.DataFrame(schema={cstart: _sys_dtype, ws_labels: pl.UInt64})
+    label_sums: list[pl.DataFrame] = [label_pairs]
+    for ascent in sorted(nodes_by_depth)[:0:-1]:
         #
-        # Note, we are using lazy evaluation. Pay attention to the set_sorted expressions. The nodes are collocated
-        # (ordered) according to the **Relative** (Nested Set) predicates we are using (cstart, cstop). Pay attention
-        # to the filters. The Progenitor side drops Leaves, whereas the Progeny side drops Roots.
-        ingest
-        .lazy().set_sorted(cstart)
-        .filter(~pl.col(cstop).sub(cstart).eq(1))
-        .select(pl.col(cstart, cstop).name.prefix("Progenitor_"))
-        # **Tree Progenitor ↑↑↑ (Parent, Root)**
-        # - Means ancestor or parent; it is the original source or originator of a lineage from which others
-        #   descend.
+        # With trees=True this ↓↓↓ also builds the tree digests (Merkle style), the Progeny with its shape: each
+        # node's digest combines one token per child, the child's own value (subtree size for hkSchemaTree, label
+        # for hkNSpaceTree) and the child's digest from the level below. The tokens are sorted before they are
+        # joined, so the digests ignore sibling order. Leaves have no Progeny; they never become a parent here and
+        # are materialised as NULL by the joins below.
         #
-        .join_where(
-            ingest.lazy().set_sorted(cstart)
-            .filter(~pl.col(cdepth).eq(0))
-            .select(
-                pl.col(cstart).name.prefix("Progeny_"),
-                pl.col(ctail).cast(dtype=pl.Utf8, strict=True)
-                .str.to_lowercase().str.replace_all(*treat_quotes_and_whitespace_zls)
-                .alias(hk_nspace),
-                pl.col(cstop).sub(cstart).cast(dtype=pl.Utf8, strict=True)
-                .alias(hk_schema)
-            ),
-            # **Tree Progeny ↑↑↑ (Children, Subtree)**
-            # - Refers to the offspring or descendants of a person, animal, or plant, essentially denoting the next
-            #   generation or results of reproduction.
-            #
-            pl.col("Progeny_" + cstart) > pl.col("Progenitor_" + cstart),
-            pl.col("Progeny_" + cstart) < pl.col("Progenitor_" + cstop)
-            #
-            # Most **Relative** (Nested Set) queries you'll encounter use the `Closed` subtree query form. That approach
-            # includes both the Progenitor and Progeny. In that form, the `self` row is inherently valid. Therefore, any
-            # in-scope node always includes itself, ensuring non-null and non-empty query results.
-            #
-            # **Open Form (Exclusive range query)**
-            # - This excludes boundary values. For instance, `WHERE xyz > 5 AND xyz < 9` may return 6 through 8
-            #   only.
-            #
-            # **Closed Form (Inclusive range query)**
-            # - The `BETWEEN` predicate includes boundary values. For instance, `WHERE xyz BETWEEN 5 AND 9` may
-            #   return 5 through 9. You get the same outcome with `>=` and `<=` as well.
-            #
+        children: pl.DataFrame = nodes_by_depth[ascent].join(sums[-1], on=cstart, how="left")
+        sums.append(
+            children
+            .group_by(ws_parent, maintain_order=False)
+            .agg(
+                (token(pl.col(hk_schema), hk_schema) + pl.col(ws_sizes).fill_null(0)).sum().alias(ws_sizes),
+                *((
+                    (
+                        pl.concat_str(hk_schema, pl.col(hk_schema_tree).cast(dtype=pl.Utf8).fill_null(""), separator=":")
+                        .sort().str.join(sep) + hk_salt[hk_schema]
+                    ).nchash.xxhash64().alias(hk_schema_tree),
+                    (
+                        pl.concat_str(hk_nspace, pl.col(hk_nspace_tree).cast(dtype=pl.Utf8).fill_null(""), separator=":")
+                        .sort().str.join(sep) + hk_salt[hk_nspace]
+                    ).nchash.xxhash64().alias(hk_nspace_tree)
+                ) if trees else (
+                    pl.lit(None, dtype=pl.UInt64).alias(hk_schema_tree), pl.lit(None, dtype=pl.UInt64).alias(hk_nspace_tree)
+                ))
+            )
+            .rename({ws_parent: cstart})
         )
-        .group_by([pl.col("Progenitor_" + cstart)], maintain_order=False)
-        .agg(hk_schema, hk_nspace)
-        # This agg expression ↑↑↑ constructs two Progeny list[string] columns
-        # - at this point the two columns are NON-NULL and the lists are both NON-EMPTY and NON-NULL
-        # - each has the full Progeny (as strings) in a single row (as a list)
-        # - we have two for different contexts
-        # - Leaf Nodes are absent
-        #
-        .select(
-            pl.col("Progenitor_" + cstart).alias(cstart),
-
-            (pl.col(hk_schema).list.sort().list.join(sep) + hk_salt[hk_schema])
-            .nchash.xxhash64().name.keep(),
+        label_pairs: pl.DataFrame = (
+            pl.concat(how="vertical", items=(
+                children.select(pl.col(ws_parent).alias(cstart), token(pl.col(hk_nspace), hk_nspace).alias(ws_labels)),
+                label_pairs.join(children.select(cstart, ws_parent), on=cstart, how="inner").select(pl.col(ws_parent).alias(cstart), ws_labels)
+            ))
+            .unique()
+        )
+        label_sums.append(label_pairs.group_by(cstart).agg(pl.col(ws_labels).sum()))
 
-            (pl.col(hk_nspace).list.unique(maintain_order=False).list.sort().list.join(sep) + hk_salt[hk_nspace])
-            .nchash.xxhash64().name.keep()
+    progeny: pl.DataFrame = (
+        pl.concat(sums, how="vertical")
+        .join(pl.concat(label_sums, how="vertical"), on=cstart, how="inner")
+        .select(
+            cstart,
+            token(pl.col(ws_sizes).cast(dtype=pl.Utf8), hk_schema).alias(hk_schema),
+            token(pl.col(ws_labels).cast(dtype=pl.Utf8), hk_nspace).alias(hk_nspace),
+            hk_schema_tree, hk_nspace_tree
         )
     )
+    progeny: pl.DataFrame = _stage("gen_hash_keys:progeny", progeny, ingest, mark=mark)
 
-    return (
+    return _stage("gen_hash_keys:keys", (
         ingest
         .lazy().set_sorted(cstart)
         .with_columns(
@@ -184,12 +473,12 @@ def gen_hash_keys(ingest: pl.DataFrame, /, *, as_uint64: bool = True) -> pl.Data
             .nchash.xxhash64().alias(hk_ptr_parent)
 
         )
-        .join(on=cstart, how="left", allow_parallel=True, other=self_range_join_no_leaves)
+        .join(on=cstart, how="left", allow_parallel=True, other=progeny.select(cstart, hk_schema, hk_nspace).lazy())
         .join(on=cstart, how="left", allow_parallel=True, other=root_nodes.lazy())
+        .pipe(lambda keys: keys.join(on=cstart, how="left", allow_parallel=True, other=progeny.select(cstart, hk_schema_tree, hk_nspace_tree).lazy()) if trees else keys)
         # These joins ↑↑↑ are phrased with an **Absolute** predicate.
-        # - self_range_join_no_leaves does not carry Leaf Nodes.
-        # - it does this because it's an efficient approach, since a Leaf is (for our purposes) a known/constant value.
-        # - this join will materialise the missing Leaf Nodes as NULL.
+        # - a Leaf has no Progeny, so its digests are NULL (it is, for our purposes, a known/constant value).
+        # - the tree digests are joined last, so the existing hash key columns keep their positions.
         #
         .with_columns(
             (pl.col(hk_ptr) if as_uint64 else pl.col(hk_ptr).map_batches(
@@ -220,9 +509,78 @@ def gen_hash_keys(ingest: pl.DataFrame, /, *, as_uint64: bool = True) -> pl.Data
                 return_dtype=pl.Utf8, function=lambda hash_keys: pl.Series(
                 "_".join((f"{hk:016x}"[:4], f"{hk:016x}"[4:-4], f"{hk:016x}"[-4:])) if hk else None for hk in hash_keys
             )))
-            .fill_null(strategy="forward").name.keep()
+            .fill_null(strategy="forward").name.keep(),
+
+            *((
+                (pl.col(hk_schema_tree) if as_uint64 else pl.col(hk_schema_tree).map_batches(
+                    return_dtype=pl.Utf8, function=lambda hash_keys: pl.Series(
+                    "_".join((f"{hk:016x}"[:4], f"{hk:016x}"[4:-4], f"{hk:016x}"[-4:])) if hk else None for hk in hash_keys
+                )))
+                .name.keep(),
+
+                (pl.col(hk_nspace_tree) if as_uint64 else pl.col(hk_nspace_tree).map_batches(
+                    return_dtype=pl.Utf8, function=lambda hash_keys: pl.Series(
+                    "_".join((f"{hk:016x}"[:4], f"{hk:016x}"[4:-4], f"{hk:016x}"[-4:])) if hk else None for hk in hash_keys
+                )))
+                .name.keep()
+            ) if trees else ())
+        )
+    ), ingest).collect()
+
+
+def gen_tree_hashes(ingest: pl.DataFrame, /, *, labels: bool = True) -> pl.DataFrame:
+    """
+    Returns one canonical form hash (hkIso) per Root tree: cStart, cHead, hkIso.
+    Sibling order is ignored, so two Root trees are isomorphic (labels=True: the same labels, labels=False:
+    the same shape) exactly when their hkIso match, up to xxhash64 collisions. Grouping a forest into
+    isomorphism classes is a group_by(hkIso), comparing two forests is comparing their sorted hkIso.
+    Nested labels (Struct, List, Array) are hashed as their JSON encoding, since a List or Array has no cast
+    to a string.
+    """
+    sep = "|"
+    hk_salt: str = f"{sep}{pl.select(pl.lit(str(ingest.schema[ctail])).nchash.xxhash64()).item()}" if labels else sep
+    # the dtype salt is hashed, an Enum dtype spells out every category
+    ws_parent, ws_label = "xWS_Parent", "xWS_Label"
+    nodes_by_depth: dict[int, pl.DataFrame] = {
+        depth: frame for (depth,), frame in
+        _with_parent(ingest)
+        .select(
+            cdepth, cstart, ws_parent, chead,
+            (
+                pl.lit(0, dtype=pl.UInt64) if not labels
+                else pl.struct(ctail).struct.json_encode().nchash.xxhash64() if ingest.schema[ctail].is_nested()
+                else pl.col(ctail).cast(dtype=pl.Utf8, strict=True).nchash.xxhash64()
+            ).alias(ws_label)
+            # labels are hashed first, so a label holding the separators cannot forge a token
+        )
+        .collect()
+        .partition_by(cdepth, as_dict=True, include_key=False).items()
+    }
+
+    canonical: pl.DataFrame = pl.DataFrame(schema={cstart: _sys_dtype, hk_iso: pl.UInt64})
+    for ascent in sorted(nodes_by_depth)[:0:-1]:
+        # one token per child (label, digest of its own children), sorted, so sibling order is ignored;
+        # only the level below is joined, leaves have no digest (0)
+        canonical: pl.DataFrame = (
+            nodes_by_depth[ascent]
+            .join(canonical, on=cstart, how="left")
+            .group_by(ws_parent, maintain_order=False)
+            .agg(
+                (
+                    pl.concat_str(ws_label, pl.col(hk_iso).fill_null(0), separator=":").sort().str.join(sep) + hk_salt
+                ).nchash.xxhash64().alias(hk_iso)
+            )
+            .rename({ws_parent: cstart})
+        )
+
+    return (
+        nodes_by_depth[0]
+        .join(canonical, on=cstart, how="left", maintain_order="left")
+        .select(
+            cstart, chead,
+            (pl.concat_str(ws_label, pl.col(hk_iso).fill_null(0), separator=":") + hk_salt).nchash.xxhash64().alias(hk_iso)
         )
-    ).collect()
+    )
 
 
 def refine_model(ingest: pl.DataFrame | pl.LazyFrame, /) -> pl.LazyFrame:
@@ -254,21 +612,29 @@ def refine_model(ingest: pl.DataFrame | pl.LazyFrame, /) -> pl.LazyFrame:
         ]
     })
 
-    ingest: pl.DataFrame = (
-        ingest
-        .lazy()
+    source: pl.LazyFrame = ingest.lazy()
+    ptr_keys: tuple[pl.Expr, ...] = tuple(
+        pl.struct(col).struct.json_encode().alias(col) if isinstance(dtype, (pl.Array, pl.List)) else pl.col(col)
+        for col, dtype in source.select(ptr_key_cols).collect_schema().items()
+    )
+    # Polars cannot group on Array labels, their JSON encoding groups alike
+    ingest: pl.LazyFrame = _stage("refine_model:co_locate", (
+        source
 
         .with_columns(
             pl.int_range(pl.len(), dtype=pl.UInt32).set_sorted()
             .alias(ws_row_number)
         )
         .with_columns(
-            pl.col(ws_row_number).first().over(ptr_key_cols[:gdown + 1])
+            pl.col(ws_row_number).first().over(ptr_keys[:gdown + 1])
             .alias(f"xWS{gdown:03}")
             for gdown in going_from_roots_down_to_the_leaves[:-1]
         )
         .sort([f"xWS{gdown:03}" for gdown in going_from_roots_down_to_the_leaves[:-1]] + [ws_row_number])
         # ↑↑↑ step1 co-locate (cluster, arrange) the nodes (rows, paths)
+    ), source)
+    ingest: pl.LazyFrame = _stage("refine_model:explode", (
+        ingest
 
         .with_columns(
             pl.sum_horizontal(
@@ -286,17 +652,189 @@ def refine_model(ingest: pl.DataFrame | pl.LazyFrame, /) -> pl.LazyFrame:
             for gdown in going_from_roots_down_to_the_leaves
         )
         # ↑↑↑ step2 explode the nodes (rows, paths)
+    ), ingest)
+    ingest: pl.LazyFrame = _stage("refine_model:dedupe", (
+        ingest
 
         .select(~cs.starts_with("xWS"))
 
-        .unique(keep="first", maintain_order=True, subset=ptr_key_cols)
+        .filter(pl.struct(ptr_keys).is_first_distinct())
         # ↑↑↑ step3 dedupe the nodes (rows, paths) - first arrival is kept
-    )
+    ), ingest)
 
     return ingest
 
 
-def expand_model(ingest: pl.DataFrame | pl.LazyFrame, /, *, vis_all: bool = False, verify_first_n: int = 0) -> pl.LazyFrame:
+def _from_mvp_to_flat(ingest: pl.DataFrame | pl.LazyFrame, going_from_roots_down_to_the_leaves: range, /) -> pl.LazyFrame:
+    # from MVP to FLAT model, one p### column per level of going_from_roots_down_to_the_leaves
+    return (
+        ingest.lazy()
+        .with_columns(
+            pl.when(pl.col(cdepth).lt(descent)).then(None)
+            .otherwise(
+                pl.when(pl.col(cdepth).ne(descent)).then(None)
+                .otherwise(ctail).fill_null(strategy="forward")
+            ).alias(f"p{descent:03}_{max(going_from_roots_down_to_the_leaves)}")
+            for descent in going_from_roots_down_to_the_leaves
+        )
+    )
+
+
+def _build_cvis(going_from_leaves_up_to_the_roots: range, /, *, vis_all: bool = False) -> tuple[tuple[pl.Expr, ...], tuple[pl.Expr, ...]]:
+    # the v### box drawing columns, derived from cDepth, cStop and cTail alone; build_cvis_a must be applied first
+
+    build_cvis_a: tuple[pl.Expr, ...] = tuple(
+        pl.when(pl.col(cdepth).eq(ascent)).then(pl.col(cstop))
+        .fill_null(strategy="forward")
+        .alias(f"v{ascent:03}_{max(going_from_leaves_up_to_the_roots)}")
+        for ascent in going_from_leaves_up_to_the_roots
+    )
+
+    vis_all = pl.col(ctail).cast(dtype=pl.Utf8) if vis_all else pl.col(ctail).cast(dtype=pl.Utf8).str.strip_chars().str.slice(offset=0, length=9)
+
+    build_cvis_b: tuple[pl.Expr, ...] = tuple((
+        pl
+        .when(pl.col(cdepth).lt(ascent)).then(vis_void)
+        .when(pl.col(cdepth).ge(ascent + 2)).then(
+            pl.when(pl.col(f"v{ascent:03}_{max(going_from_leaves_up_to_the_roots)}").eq(pl.col(f"v{ascent + 1:03}_{max(going_from_leaves_up_to_the_roots)}")))
+            .then(vis_void).otherwise(vis_pipe)
+        )
+        .when(pl.col(cdepth).eq(ascent + 1)).then(
+            pl.when(pl.col(f"v{ascent:03}_{max(going_from_leaves_up_to_the_roots)}").eq(pl.col(f"v{ascent + 1:03}_{max(going_from_leaves_up_to_the_roots)}")))
+            .then(vis_closed).otherwise(vis_open)
+        )
+        .otherwise(vis_all)
+        if ascent < max(going_from_leaves_up_to_the_roots) - 1 else
+
+        pl
+        .when(pl.col(cdepth).lt(ascent)).then(vis_void)
+        .when(pl.col(cdepth).eq(ascent + 1)).then(
+            pl.when(pl.col(f"v{ascent:03}_{max(going_from_leaves_up_to_the_roots)}").eq(pl.col(f"v{ascent + 1:03}_{max(going_from_leaves_up_to_the_roots)}")))
+            .then(vis_closed).otherwise(vis_open)
+        )
+        .otherwise(vis_all)
+        if ascent < max(going_from_leaves_up_to_the_roots) else
+
+        pl
+        .when(pl.col(cdepth).lt(ascent)).then(vis_void)
+        .otherwise(vis_all)
+
+    ).alias(f"v{ascent:03}_{max(going_from_leaves_up_to_the_roots)}") for ascent in going_from_leaves_up_to_the_roots)
+
+    return build_cvis_a, build_cvis_b
+
+
+def validate_model(ingest: pl.DataFrame | pl.LazyFrame, /) -> pl.DataFrame:
+    """
+    Validates every row of an MVP or FLAT model before it is expanded. The checks run lazily on the input,
+    reading only the columns they need: an MVP path is never expanded into p### columns, it is identified
+    level by level by the path of its parent and its own label, so duplicates are found exactly.
+    Each offending row is flagged with the first issue that applies:
+    gap: the path has a NULL level above the node (FLAT only),
+    orphan: the node is more than one level deeper than the row before it, so its parent cannot precede it,
+    not_colocated: the parent path is neither the row before nor one of its ancestors (FLAT only),
+    duplicate: the path repeats an earlier row.
+    Returns one row per run of consecutive rows with the same issue, as [cStart, cStop) row ranges;
+    an empty DataFrame means the model is valid.
+    """
+    if cs.expand_selector(ingest, cs_ptr):
+        ptr_key_cols: tuple[str, ...] = tuple(sorted(cs.expand_selector(ingest, cs_ptr)))
+        build_cdepth: pl.Expr = pl.sum_horizontal(cs_ptr.is_not_null()).sub(1).cast(dtype=pl.Int64)
+        is_gap: pl.Expr = pl.any_horizontal(
+            pl.col(ptr_key_cols[0]).is_null(),
+            *(pl.col(upper).is_null() & pl.col(lower).is_not_null() for upper, lower in zip(ptr_key_cols, ptr_key_cols[1:]))
+        )
+        is_not_colocated: pl.Expr = ~pl.all_horizontal(
+            pl.lit(True),
+            *(pl.col(upper).eq_missing(pl.col(upper).shift(1)) | pl.col(lower).is_null() for upper, lower in zip(ptr_key_cols, ptr_key_cols[1:]))
+        )
+        # a co-located node shares its first cDepth levels with the row before it
+        # (a level below the node's own is NULL, 5x cheaper than comparing the level with cDepth)
+        build_path_hash: pl.Expr = pl.struct(pl.col(ptr_key_cols).hash()).hash()
+        # hashed level by level, nested labels (Struct, List, Array) do not hash inside a struct
+
+        issues, distinct_paths = pl.collect_all((
+            ingest.lazy()
+            .select(
+                pl.when(is_gap).then(pl.lit("gap"))
+                .when(build_cdepth.gt(build_cdepth.shift(1, fill_value=-1).add(1))).then(pl.lit("orphan"))
+                .when(is_not_colocated).then(pl.lit("not_colocated"))
+                .alias("issue"),
+                pl.int_range(pl.len(), dtype=_sys_dtype).alias(cstart)
+            )
+            .filter(pl.col("issue").is_not_null()),
+            ingest.lazy().select(build_path_hash.n_unique().alias("xWS_Distinct"), pl.len())
+        ))
+        duplicates: pl.DataFrame = pl.DataFrame(schema={cstart: _sys_dtype})
+        if distinct_paths.item(0, "xWS_Distinct") < distinct_paths.item(0, "len"):
+            duplicates: pl.DataFrame = (
+                ingest.lazy()
+                .select(*ptr_key_cols, pl.int_range(pl.len(), dtype=_sys_dtype).alias(cstart))
+                .filter(build_path_hash.is_duplicated())
+                .filter(~pl.struct(ptr_key_cols).is_first_distinct())
+                .select(cstart)
+                .collect()
+                # exact on the rows that share a path hash, so hash collisions are never reported
+            )
+        # a valid model is checked with the path hashes alone
+    else:
+        ws_label, ws_parent, ws_parent_path, ws_path = "xWS_Label", "xWS_Parent", "xWS_ParentPath", "xWS_Path"
+        label_key: pl.Expr = (
+            pl.struct(ctail).struct.json_encode() if isinstance(ingest.collect_schema()[ctail], (pl.Array, pl.List)) else pl.col(ctail)
+        )
+        # Polars cannot group on Array labels, their JSON encoding groups alike
+        issues, nodes = pl.collect_all((
+            ingest.lazy()
+            .select(
+                pl.when(pl.col(cdepth).cast(dtype=pl.Int64).gt(pl.col(cdepth).cast(dtype=pl.Int64).shift(1, fill_value=-1).add(1)))
+                .then(pl.lit("orphan")).alias("issue"),
+                pl.int_range(pl.len(), dtype=_sys_dtype).alias(cstart)
+            )
+            .filter(pl.col("issue").is_not_null()),
+            ingest.lazy().select(pl.int_range(pl.len(), dtype=_sys_dtype).alias(cstart), cdepth, label_key.alias(ws_label))
+        ))
+        nodes_by_depth: dict[int, pl.DataFrame] = {
+            depth: frame for (depth,), frame in nodes.partition_by(cdepth, as_dict=True, include_key=False).items()
+        }
+
+        paths: pl.DataFrame = pl.DataFrame(schema={cstart: _sys_dtype, ws_path: _sys_dtype})
+        duplicates: list[pl.DataFrame] = [pl.DataFrame(schema={cstart: _sys_dtype})]
+        for descent in range(max(nodes_by_depth, default=-1) + 1):
+            #
+            # Going from the roots down to the leaves, a path is numbered by the first row that carries it: two
+            # rows share a path exactly when their parents do and their labels are equal. The parent is the
+            # closest preceding row one level up (a backward as-of join), so every row is read once, as a child.
+            #
+            paths: pl.DataFrame = (
+                nodes_by_depth.get(descent, nodes.clear())
+                .drop(cdepth, strict=False)
+                .join_asof(
+                    paths.select(pl.col(cstart).alias(ws_parent), pl.col(ws_path).alias(ws_parent_path)),
+                    left_on=cstart, right_on=ws_parent, strategy="backward", check_sortedness=False
+                )
+                .select(cstart, pl.col(cstart).min().over(ws_parent_path, ws_label).alias(ws_path))
+            )
+            duplicates.append(paths.filter(pl.col(ws_path).ne(pl.col(cstart))).select(cstart))
+        duplicates: pl.DataFrame = pl.concat(duplicates, how="vertical")
+
+    if duplicates.height:
+        issues: pl.DataFrame = (
+            pl.concat((issues, duplicates.select(pl.lit("duplicate").alias("issue"), cstart)))
+            .unique(cstart, keep="first", maintain_order=True).sort(cstart)
+        )
+
+    return (
+        issues
+        .with_columns(
+            (pl.col(cstart).diff().ne(1) | pl.col("issue").ne(pl.col("issue").shift(1))).fill_null(True).cum_sum().alias("xWS_Run")
+        )
+        .group_by("xWS_Run", maintain_order=True)
+        .agg(pl.col("issue").first(), pl.col(cstart).first(), pl.col(cstart).last().add(1).alias(cstop))
+        .drop("xWS_Run")
+    )
+
+
+def expand_model(ingest: pl.DataFrame | pl.LazyFrame, /, *, columns: tuple[str, ...] = None, vis: bool = False, vis_all: bool = False, verify_first_n: int = 0) -> pl.LazyFrame:
     """
     Computes integer-based boundaries and other metrics for each node in a tree DataFrame.
     In addition to assigning left and right pointers for nested set style queries, this function
@@ -304,6 +842,11 @@ def expand_model(ingest: pl.DataFrame | pl.LazyFrame, /, *, vis_all: bool = Fals
     subtree extraction in both Python (through slicing) and SQL (using BETWEEN clauses).
     By enriching the DataFrame with these bounds and metrics, downstream operations on hierarchical
     data become more flexible, performant, and intuitive.
+    The v### box drawing columns are only rendered with vis=True; render_model renders a window of rows.
+    Breaking change: vis used to default to True here and in restore_model, sink_model and
+    expand_model_parallel; callers that read v### must now pass vis=True. With columns set, only those core columns (and the ones they are computed from) are built, e.g.
+    columns=(cstart, cstop, cdepth) skips cWidth, cOut and every derived metric; the xWS### working
+    storage is only built when cStop or cOut is needed.
     """
     # previously called build_trees
     # previously called from_mvp_flat_to_full
@@ -321,33 +864,16 @@ def expand_model(ingest: pl.DataFrame | pl.LazyFrame, /, *, vis_all: bool = Fals
 
     # ↓↓↓ from MVP to FLAT model
     if not cs.expand_selector(ingest, cs_ptr):
-        ingest: pl.LazyFrame = (
-            ingest.lazy()
-            .with_columns(
-                pl.when(pl.col(cdepth).lt(descent)).then(None)
-                .otherwise(
-                    pl.when(pl.col(cdepth).ne(descent)).then(None)
-                    .otherwise(ctail).fill_null(strategy="forward")
-                ).alias(f"p{descent:03}_{max(going_from_roots_down_to_the_leaves)}")
-                for descent in going_from_roots_down_to_the_leaves
-            )
-        )
+        ingest: pl.LazyFrame = _stage("expand_model:mvp_to_flat", _from_mvp_to_flat(ingest, going_from_roots_down_to_the_leaves), ingest)
     # ↑↑↑ from MVP to FLAT model
 
     # ↓↓↓ from FLAT to FULL model
     ptr_key_cols: tuple[str, ...] = tuple(sorted(cs.expand_selector(ingest, cs_ptr)))
     assert ptr_key_cols and all(ptr_key_cols) and ptr_key_cols == tuple(cs.expand_selector(ingest, cs_ptr))
-    assert (not verify_first_n) or ingest.lazy().select(cs_ptr).head(verify_first_n).collect().height == (
-        ingest.lazy().select(cs_ptr).head(verify_first_n)
-        .filter(
-            ((cs_ptr & cs.first()).shift(1).is_null() & pl.sum_horizontal(cs_ptr.is_not_null()).eq(1)) |
-            pl.concat_list(cs_ptr).list.head(pl.sum_horizontal(cs_ptr.is_not_null()).sub(1))
-            .eq(pl.concat_list(cs_ptr).shift(1).list.head(pl.sum_horizontal(cs_ptr.is_not_null()).sub(1)))
-        )
-        .unique(keep="any", maintain_order=False)
-        .collect()
-        .height
-    ), "The verify_first_n parameter is set, but the DataFrame contains identical rows or rows not colocated correctly"
+    assert (not verify_first_n) or not (issues := validate_model(ingest.lazy().head(verify_first_n))).height, (
+        f"The verify_first_n parameter is set, but the DataFrame contains identical rows or rows not colocated correctly\n{issues}"
+    )
+    # validate_model checks whole inputs, verify_first_n a prefix of them
 
     #
     # Best Measured Performance with default parameters is ≈ 11.3M rows/sec. The system processes 100,000 rows
@@ -391,82 +917,368 @@ def expand_model(ingest: pl.DataFrame | pl.LazyFrame, /, *, vis_all: bool = Fals
             ).len().sub(1).over(f"xWS{ascent:03}")
         )
 
-    build_cvis_a: tuple[pl.Expr, ...] = tuple(
-        pl.when(pl.col(cdepth).eq(ascent)).then(pl.col(cstop))
-        .fill_null(strategy="forward")
-        .alias(f"v{ascent:03}_{max(going_from_leaves_up_to_the_roots)}")
-        for ascent in going_from_leaves_up_to_the_roots
-    )
-
-    vis_all = pl.col(ctail).cast(dtype=pl.Utf8) if vis_all else pl.col(ctail).cast(dtype=pl.Utf8).str.strip_chars().str.slice(offset=0, length=9)
-
-    build_cvis_b: tuple[pl.Expr, ...] = tuple((
-        pl
-        .when(pl.col(cdepth).lt(ascent)).then(vis_void)
-        .when(pl.col(cdepth).ge(ascent + 2)).then(
-            pl.when(pl.col(f"v{ascent:03}_{max(going_from_leaves_up_to_the_roots)}").eq(pl.col(f"v{ascent + 1:03}_{max(going_from_leaves_up_to_the_roots)}")))
-            .then(vis_void).otherwise(vis_pipe)
-        )
-        .when(pl.col(cdepth).eq(ascent + 1)).then(
-            pl.when(pl.col(f"v{ascent:03}_{max(going_from_leaves_up_to_the_roots)}").eq(pl.col(f"v{ascent + 1:03}_{max(going_from_leaves_up_to_the_roots)}")))
-            .then(vis_closed).otherwise(vis_open)
-        )
-        .otherwise(vis_all)
-        if ascent < max(going_from_leaves_up_to_the_roots) - 1 else
-
-        pl
-        .when(pl.col(cdepth).lt(ascent)).then(vis_void)
-        .when(pl.col(cdepth).eq(ascent + 1)).then(
-            pl.when(pl.col(f"v{ascent:03}_{max(going_from_leaves_up_to_the_roots)}").eq(pl.col(f"v{ascent + 1:03}_{max(going_from_leaves_up_to_the_roots)}")))
-            .then(vis_closed).otherwise(vis_open)
-        )
-        .otherwise(vis_all)
-        if ascent < max(going_from_leaves_up_to_the_roots) else
-
-        pl
-        .when(pl.col(cdepth).lt(ascent)).then(vis_void)
-        .otherwise(vis_all)
+    build_cvis_a, build_cvis_b = _build_cvis(going_from_leaves_up_to_the_roots, vis_all=vis_all) if vis else ((), ())
+    # O(rows × depth) string work, skipped unless asked for
 
-    ).alias(f"v{ascent:03}_{max(going_from_leaves_up_to_the_roots)}") for ascent in going_from_leaves_up_to_the_roots)
+    columns: tuple[str, ...] = _core_12 if columns is None else tuple(columns)
+    assert columns and set(columns) <= set(_core_12), f"The columns parameter only accepts core columns {_core_12}"
+    needed: set[str] = set(columns) | ({ctail, cdepth, cstop} if vis else set())
+    needed |= {dep for col in tuple(needed) for dep in _core_deps[col]}
+    needed |= {dep for col in tuple(needed) for dep in _core_deps[col]}
+    # two passes reach the closure, no dependency chain is longer than two
+    build_working_storage = build_working_storage if needed & {cstop, cout} else ()
 
-    ingest: pl.LazyFrame = (
-        ingest
-        .lazy()
+    flat: pl.LazyFrame = ingest.lazy()
+    ingest: pl.LazyFrame = _stage("expand_model:labels", (
+        flat
         .with_columns(
-            pl.col(ptr_key_cols[0]).alias(chead),
-            build_ctail.alias(ctail),
-            build_cdepth.alias(cdepth),
-            pl.int_range(pl.len(), dtype=_sys_dtype).set_sorted().alias(cstart),
+            *(build for col, build in (
+                (chead, pl.col(ptr_key_cols[0]).alias(chead)),
+                (ctail, build_ctail.alias(ctail)),
+                (cdepth, build_cdepth.alias(cdepth)),
+                (cstart, pl.int_range(pl.len(), dtype=_sys_dtype).set_sorted().alias(cstart))
+            ) if col in needed),
             *build_working_storage
         )
+    ), flat)
+    ingest: pl.LazyFrame = _stage("expand_model:bounds", (
+        ingest
         .with_columns(
-            build_cstop.add(pl.col(cstart)).alias(cstop),
-            # +88.72% combined cpu cost ↓↓↓
-            build_cwidth.alias(cwidth),
-            build_cout.alias(cout)
-            # +88.72% combined cpu cost ↑↑↑
+            *(build for col, build in (
+                (cstop, build_cstop.add(pl.col(cstart)).alias(cstop)),
+                # +88.72% combined cpu cost ↓↓↓
+                (cwidth, build_cwidth.alias(cwidth)),
+                (cout, build_cout.alias(cout))
+                # +88.72% combined cpu cost ↑↑↑
+            ) if col in needed)
         )
+    ), ingest)
+    ingest: pl.LazyFrame = _stage("expand_model:derived", (
+        ingest
         .with_columns(
             # +3.86% combined cpu cost ↓↓↓
-            pl.col(cstop).sub(cstart).alias(csize),
-            pl.col(cdepth).eq(0).alias(cis_root),
-            pl.col(cstop).sub(cstart).eq(1).alias(cis_leaf),
-            pl.col(cstart).mul(2).sub(cdepth).add(1).cast(dtype=_sys_dtype).alias(cleft),
-            pl.col(cstop).mul(2).sub(cdepth).cast(dtype=_sys_dtype).alias(cright),
+            *(build for col, build in (
+                (csize, pl.col(cstop).sub(cstart).alias(csize)),
+                (cis_root, pl.col(cdepth).eq(0).alias(cis_root)),
+                (cis_leaf, pl.col(cstop).sub(cstart).eq(1).alias(cis_leaf)),
+                (cleft, pl.col(cstart).mul(2).sub(cdepth).add(1).cast(dtype=_sys_dtype).alias(cleft)),
+                (cright, pl.col(cstop).mul(2).sub(cdepth).cast(dtype=_sys_dtype).alias(cright))
+            ) if col in needed)
             # +3.86% combined cpu cost ↑↑↑
-            *build_cvis_a[::-1]
         )
+    ), ingest)
+    ingest: pl.LazyFrame = _stage("expand_model:vis", (
+        ingest
+        .with_columns(*build_cvis_a[::-1])
         .with_columns(*build_cvis_b)
         .select(
-            cs_ptr, cs_vis, *_core_12, cs_hash, cs_uqu,
+            cs_ptr, cs_vis, *(col for col in _core_12 if col in columns), cs_hash, cs_uqu,
             ~(cs_ptr | cs_vis | cs_core_12 | cs_hash | cs_uqu | cs.starts_with("xWS"))
         )
-    )
-    # ↑↑↑ from FLAT to FULL model
+    ), ingest)
+    # ↑↑↑ from FLAT to FULL model, one lazy query unless profile_stages is active
 
     return ingest
 
 
+def _root_partitions(ingest: pl.LazyFrame, rows_per_partition: int, /) -> tuple[tuple[tuple[int, int], ...], pl.DataFrame]:
+    # root aligned (offset, length) partitions of an MVP or FLAT model, plus the forest-global node count per depth
+    assert rows_per_partition > 0
+
+    build_cdepth: pl.Expr = (
+        pl.sum_horizontal(cs_ptr.is_not_null()).sub(1).cast(dtype=_sys_dtype) if cs.expand_selector(ingest, cs_ptr)
+        else pl.col(cdepth)
+    )
+    root_nodes, depth_widths = pl.collect_all((
+        ingest.select(build_cdepth.eq(0).arg_true().cast(dtype=pl.Int64).alias(cstart)),
+        ingest.group_by(build_cdepth.alias(cdepth)).agg(pl.len().cast(dtype=_sys_dtype).alias(cwidth)).sort(cdepth)
+    ))
+    assert root_nodes.height and root_nodes.item(0, cstart) == 0, "The first row must be a Root node (cDepth == 0)"
+
+    offsets: list[int] = (
+        root_nodes
+        .filter(pl.col(cstart).floordiv(rows_per_partition).ne_missing(pl.col(cstart).floordiv(rows_per_partition).shift(1)))
+        .get_column(cstart).to_list()
+    )
+    # a partition opens at the first Root to cross each multiple of rows_per_partition, so it only ever exceeds
+    # rows_per_partition by the remainder of the single tree straddling that boundary
+
+    return tuple(zip(offsets, (bb - aa for aa, bb in zip(offsets, offsets[1:] + [depth_widths.get_column(cwidth).sum()])))), depth_widths
+
+
+def _rebase_partition(offset: int, depth_widths: pl.DataFrame, /) -> tuple[pl.Expr, ...]:
+    # move a partition's nested set bounds past the rows before it and restore the forest-global cWidth
+    return (
+        pl.col(cstart, cstop).add(pl.lit(offset, dtype=_sys_dtype)),
+        pl.col(cleft, cright).add(pl.lit(offset * 2, dtype=_sys_dtype)),
+        pl.col(cdepth).replace_strict(
+            old=depth_widths.get_column(cdepth), new=depth_widths.get_column(cwidth), return_dtype=_sys_dtype
+        ).alias(cwidth)
+    )
+
+
+def sink_model(ingest: str | pl.DataFrame | pl.LazyFrame, path: str, /, *, rows_per_batch: int = 1_000_000, vis: bool = False, vis_all: bool = False) -> pl.LazyFrame:
+    """
+    Expands an MVP or FLAT model that does not fit in memory, one batch of whole Root trees at a time.
+    Every Root tree (a cDepth == 0 boundary) is independent, so each batch is expanded on its own, its
+    nested set bounds are rebased past the rows already written, and cWidth is restored to its forest-global
+    value. Batches are sunk to numbered Parquet files under path, so peak memory is bounded by the largest
+    batch rather than the dataset. The result is a lazy scan over those files, identical to expand_model.
+    """
+
+    ingest: pl.LazyFrame = pl.scan_parquet(ingest) if isinstance(ingest, str) else ingest.lazy()
+    assert not (Path(path).exists() and any(Path(path).iterdir())), "The path must be a new or empty directory"
+    Path(path).mkdir(parents=True, exist_ok=True)
+
+    partitions, depth_widths = _root_partitions(ingest, rows_per_batch)
+    going_from_roots_down_to_the_leaves: range = range(
+        len(cs.expand_selector(ingest, cs_ptr)) if cs.expand_selector(ingest, cs_ptr)
+        else depth_widths.height
+    )
+    # every batch is widened to the forest-global depth, so all files share the same p### and v### columns
+
+    for idx, (offset, length) in enumerate(partitions):
+        (
+            ingest.slice(offset=offset, length=length)
+            .pipe(lambda Δ: Δ if cs.expand_selector(Δ, cs_ptr) else _from_mvp_to_flat(Δ, going_from_roots_down_to_the_leaves))
+            .pipe(expand_model, vis=vis, vis_all=vis_all)
+            .with_columns(*_rebase_partition(offset, depth_widths))
+            .sink_parquet(Path(path) / f"{idx:06}.parquet")
+        )
+
+    return pl.scan_parquet(Path(path) / "*.parquet")
+
+
+def _expand_partition(source: str | pl.DataFrame, offset: int, length: int, going_from_roots_down_to_the_leaves: range, depth_widths: pl.DataFrame, vis: bool, vis_all: bool, /) -> pl.DataFrame:
+    # process pool worker: expand one root aligned partition and rebase it onto the forest. A Parquet source is
+    # scanned and sliced here, so only its path crosses the process boundary; a DataFrame source is the slice
+    partition: pl.LazyFrame = pl.scan_parquet(source).slice(offset=offset, length=length) if isinstance(source, str) else source.lazy()
+    return (
+        (partition if cs.expand_selector(partition, cs_ptr) else _from_mvp_to_flat(partition, going_from_roots_down_to_the_leaves))
+        .pipe(expand_model, vis=vis, vis_all=vis_all)
+        .with_columns(*_rebase_partition(offset, depth_widths))
+        .collect()
+    )
+
+
+def expand_model_parallel(ingest: str | pl.DataFrame | pl.LazyFrame, /, *, max_workers: int = None, rows_per_partition: int = 250_000, vis: bool = False, vis_all: bool = False) -> pl.LazyFrame:
+    """
+    Expands an MVP or FLAT model across a pool of worker processes. The input is partitioned on Root tree
+    (cDepth == 0) boundaries into runs of roughly rows_per_partition rows, each partition is expanded by its
+    own worker, and the results are stitched back in order with their nested set bounds rebased onto the
+    forest and cWidth restored to its forest-global value. A Parquet path is sliced by each worker; any other
+    input is sliced here, with at most two partitions per worker in flight, so the input is never held twice.
+    The result is identical to expand_model; a single partition (or max_workers=1) is expanded in-process.
+    """
+
+    source: str | None = ingest if isinstance(ingest, str) else None
+    ingest: pl.LazyFrame = pl.scan_parquet(ingest) if isinstance(ingest, str) else ingest.lazy()
+
+    partitions, depth_widths = _root_partitions(ingest, rows_per_partition)
+    going_from_roots_down_to_the_leaves: range = range(
+        len(cs.expand_selector(ingest, cs_ptr)) if cs.expand_selector(ingest, cs_ptr)
+        else depth_widths.height
+    )
+    job: Callable[[int, int], tuple] = lambda offset, length: (
+        source or ingest.slice(offset=offset, length=length).collect(), offset, length,
+        going_from_roots_down_to_the_leaves, depth_widths, vis, vis_all
+    )
+    # ↑↑↑ a slice is only collected when its partition is submitted
+
+    if len(partitions) == 1 or max_workers == 1:
+        return pl.concat((_expand_partition(*job(offset, length)) for offset, length in partitions), how="vertical", rechunk=False).lazy()
+
+    expanded: list[pl.DataFrame] = []
+    in_flight: deque = deque()
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context("spawn")) as executor:
+        # spawn rather than fork; a forked child inherits the Polars thread pool in an undefined state
+        for offset, length in partitions:
+            if len(in_flight) >= 2 * (max_workers or cpu_count() or 1):
+                expanded.append(in_flight.popleft().result())
+            in_flight.append(executor.submit(_expand_partition, *job(offset, length)))
+        expanded.extend(future.result() for future in in_flight)
+    return pl.concat(expanded, how="vertical", rechunk=False).lazy()
+
+
+def write_model(ingest: pl.DataFrame, path: str, /, *, rows_per_group: int = 1_000_000) -> pl.DataFrame:
+    """
+    Writes a FULL model to Parquet with its row groups on Root tree boundaries (as _root_partitions cuts
+    them, so a group only exceeds rows_per_group by the one tree straddling its end), each carrying cStart
+    and cStop min/max statistics. A sidecar index (path with the suffix .index.parquet) maps every Root tree,
+    by cHead and hkKVP_TreeKey when present, to its cStart, cStop and row group; it is also returned.
+    read_subtree turns a lookup into a cStart range predicate, which the statistics prune to those groups.
+    """
+    from pyarrow.parquet import ParquetWriter
+    # Polars writes equal sized row groups only; the root aligned groups need pyarrow
+
+    partitions, _ = _root_partitions(ingest.lazy(), rows_per_group)
+    table = ingest.to_arrow()
+    with ParquetWriter(path, schema=table.schema, write_statistics=True) as writer:
+        for offset, length in partitions:
+            writer.write_table(table.slice(offset, length), row_group_size=length)
+            # ↑↑↑ sliced on the Arrow side, zero-copy (a sliced Polars Struct column does not export to Arrow)
+
+    index: pl.DataFrame = (
+        ingest
+        .filter(pl.col(cdepth).eq(0))
+        .select(
+            chead, *((hk_kvp_treekey,) if hk_kvp_treekey in ingest.columns else ()), cstart, cstop,
+            pl.lit(pl.Series([offset for offset, _ in partitions], dtype=_sys_dtype)).search_sorted(pl.col(cstart), side="right").sub(1).cast(dtype=_sys_dtype).alias(cgroup)
+        )
+    )
+    index.write_parquet(Path(path).with_suffix(".index.parquet"))
+
+    return index
+
+
+def read_subtree(path: str, key, /, *, by: str = cstart) -> pl.DataFrame:
+    """
+    Reads one subtree of a model written by write_model without reading the file: the subtree rooted at
+    cStart key (by=cStart), or the Root trees whose cHead or hkKVP_TreeKey is key. Both become a cStart range
+    predicate on scan_parquet, so only the row groups whose cStart statistics overlap it are read. A
+    subtree at cStart needs its cStop first, which is a one row read from a single row group.
+    """
+    assert by in (cstart, chead, hk_kvp_treekey)
+    if by == cstart:
+        ranges: list[tuple[int, int]] = [(key, pl.scan_parquet(path).filter(pl.col(cstart).eq(key)).select(cstop).collect().item())]
+    else:
+        ranges: list[tuple[int, int]] = pl.read_parquet(Path(path).with_suffix(".index.parquet")).filter(pl.col(by).eq(key)).select(cstart, cstop).rows()
+
+    return (
+        pl.scan_parquet(path)
+        .filter(pl.any_horizontal(False, *(pl.col(cstart).is_between(start, stop, closed="left") for start, stop in ranges)))
+        .collect()
+    )
+
+
+def register_model(ingest: pl.DataFrame, con, /, *, name: str = "model", ptr: bool = False):
+    """
+    Registers a FULL model as the view name of the DuckDB connection con, and installs the table macros
+    subtree(label), ancestors(label) and descendants_at_depth(label, d), d levels below, each one block of rows
+    per labelled node in pre-order. The macros belong to the most recently registered model; registering
+    another replaces them. The model is exported to Arrow at the oldest compat level, which copies its string
+    columns out of Utf8View (the pyarrow filters DuckDB pushes into an Arrow scan cannot read it), so no
+    connection setting is changed. The macros resolve cStart positions on the narrow cStart, cStop and cDepth
+    columns first (a range of cStart, an as-of merge per ancestor depth, a depth equi-join bounded by cStart)
+    and fetch whole rows with one cStart equi-join, so no plan is a cartesian BETWEEN self-join. The p### and
+    v### columns are left out unless ptr=True, as every query scans each registered column once.
+    """
+    assert all(col in ingest.columns for col in (ctail, cdepth, cstart, cstop))
+
+    con.register(name, (ingest if ptr else ingest.select(~(cs_ptr | cs_vis))).to_arrow(compat_level=pl.CompatLevel.oldest()))
+    view: str = '"{}"'.format(name.replace('"', '""'))
+    # ↑↑↑ name quoted as an SQL identifier
+
+    nodes: str = f"(SELECT {cstart} AS xWS_Start, {cstop} AS xWS_Stop, {cdepth} AS xWS_Depth FROM {view} WHERE {ctail} = label)"
+    for macro, params, positions in (
+        ("subtree", "label", f"SELECT xWS_Start, unnest(range(xWS_Start, xWS_Stop)) AS xWS_Pos FROM {nodes}"),
+        ("ancestors", "label", f"""
+            SELECT xWS_Start, xWS_Pos FROM (
+                SELECT xWS_Start, xWS_Probe, last_value(CASE WHEN NOT xWS_Probe THEN xWS_Start END IGNORE NULLS)
+                OVER (PARTITION BY xWS_Depth ORDER BY xWS_Start, xWS_Probe) AS xWS_Pos
+                FROM (
+                    SELECT {cstart} AS xWS_Start, {cdepth} AS xWS_Depth, false AS xWS_Probe FROM {view}
+                    UNION ALL
+                    SELECT xWS_Start, unnest(range(xWS_Depth)) AS xWS_Depth, true AS xWS_Probe FROM {nodes}
+                )
+            ) WHERE xWS_Probe
+        """),
+        # ↑↑↑ in pre-order the ancestor at each depth is the closest preceding node of that depth (as _with_parent):
+        # an as-of lookup, spelled as a sorted merge of the labelled nodes into the nodes of each depth, since an
+        # ASOF JOIN on an Arrow scan (no row estimates) is planned as a nested loop
+        ("descendants_at_depth", "label, d", f"""
+            SELECT P.xWS_Start, D.{cstart} AS xWS_Pos
+            FROM {nodes} AS P JOIN (SELECT {cdepth}, {cstart} FROM {view}) AS D
+            ON D.{cdepth} = P.xWS_Depth + d AND D.{cstart} >= P.xWS_Start AND D.{cstart} < P.xWS_Stop
+        """)
+    ):
+        con.execute(f"""
+            CREATE OR REPLACE TEMP MACRO {macro}({params}) AS TABLE
+            SELECT C.* FROM ({positions}) AS X JOIN {view} AS C ON C.{cstart} = X.xWS_Pos
+            ORDER BY X.xWS_Start, X.xWS_Pos;
+        """)
+
+    return con
+
+
+def append_trees(ingest: pl.DataFrame, new_input: str | pl.DataFrame | pl.LazyFrame, /, *, vis_all: bool = False) -> pl.DataFrame:
+    """
+    Appends the Root trees of an MVP or FLAT model to the end of a FULL model, expanding only the new trees.
+    The new nested set bounds are rebased past the existing rows, cWidth is reconciled with the new counts
+    per depth (for the existing rows too, since it is forest-global) and the p### and v### column sets are
+    widened when the new trees are deeper. Hash keys, if present, are generated for the new trees alone.
+    The new labels must have the model's label dtype; for an Enum model they are cast to its categories,
+    and a label outside them fails the append before anything is spliced.
+    """
+    assert not cs.expand_selector(ingest, cs_uqu), "Drop the uq columns before appending and regenerate them after"
+
+    new_input: pl.LazyFrame = pl.scan_parquet(new_input) if isinstance(new_input, str) else new_input.lazy()
+    label_cols: tuple[str, ...] = tuple(cs.expand_selector(new_input, cs_ptr)) or (ctail,)
+    if isinstance(ingest.schema[ctail], pl.Enum):
+        unknown: pl.Series = (
+            pl.concat(new_input.select(pl.col(col).cast(dtype=pl.Utf8).alias(ctail)) for col in label_cols)
+            .drop_nulls().unique()
+            .filter(~pl.col(ctail).is_in(ingest.schema[ctail].categories.implode()))
+            .collect().get_column(ctail)
+        )
+        assert unknown.is_empty(), f"The new labels {unknown.head(5).to_list()} are not categories of the model's Enum labels"
+        new_input: pl.LazyFrame = new_input.with_columns(pl.col(label_cols).cast(dtype=pl.Utf8).cast(dtype=ingest.schema[ctail]))
+    assert all(new_input.collect_schema()[col] == ingest.schema[ctail] for col in label_cols), (
+        f"The new labels need the model's label dtype {ingest.schema[ctail]}: it salts the hash keys and the rows are spliced as they are"
+    )
+    new_widths: pl.DataFrame = (
+        new_input
+        .group_by(
+            (pl.sum_horizontal(cs_ptr.is_not_null()).sub(1) if cs.expand_selector(new_input, cs_ptr) else pl.col(cdepth))
+            .cast(dtype=_sys_dtype).alias(cdepth)
+        )
+        .agg(pl.len().cast(dtype=_sys_dtype).alias(cwidth))
+        .collect()
+    )
+    # ↑↑↑ the node count per depth of the new trees, by depth (cDepth, or the non NULL p### of a FLAT model)
+    vis: bool = bool(cs.expand_selector(ingest, cs_vis))
+
+    depth_widths: pl.DataFrame = (
+        pl.concat(how="vertical", items=(
+            ingest.select(cdepth, pl.col(cwidth).cast(dtype=_sys_dtype)).unique(subset=cdepth, keep="any"),
+            new_widths
+        ))
+        .group_by(cdepth).agg(pl.col(cwidth).sum()).sort(cdepth)
+    )
+    going_from_roots_down_to_the_leaves: range = range(max(len(cs.expand_selector(ingest, cs_ptr)), depth_widths.height))
+
+    appended: pl.DataFrame = (
+        new_input
+        .pipe(lambda Δ: Δ if cs.expand_selector(Δ, cs_ptr) else _from_mvp_to_flat(Δ, going_from_roots_down_to_the_leaves))
+        .pipe(expand_model, vis=vis, vis_all=vis_all)
+        .collect()
+        .pipe(lambda Δ: Δ.pipe(gen_hash_keys, as_uint64=ingest.schema[hk_ptr] == pl.UInt64, trees=hk_schema_tree in ingest.columns) if hk_ptr in ingest.columns else Δ)
+        # ↑↑↑ before rebasing, since gen_hash_keys slices the Root trees by cStart
+        .with_columns(*_rebase_partition(ingest.height, depth_widths))
+        .pipe(_reshape_levels, going_from_roots_down_to_the_leaves, vis=vis)
+    )
+    # ↑↑↑ the new trees on their own, already carrying the forest-global bounds and cWidth
+
+    ingest: pl.DataFrame = (
+        ingest
+        .with_columns(
+            pl.when(pl.col(cdepth).is_in(new_widths.get_column(cdepth))).then(
+                pl.col(cdepth).replace_strict(old=depth_widths.get_column(cdepth), new=depth_widths.get_column(cwidth), return_dtype=_sys_dtype)
+            ).otherwise(pl.col(cwidth)).cast(dtype=ingest.schema[cwidth]).alias(cwidth)
+        )
+        .pipe(_reshape_levels, going_from_roots_down_to_the_leaves, vis=vis)
+    )
+    # ↑↑↑ the existing rows only change cWidth, and only at the depths the new trees reach
+
+    return pl.concat(how="vertical", items=(
+        ingest,
+        appended.select(
+            pl.col(col).cast(dtype=dtype) if col in appended.columns else pl.lit(None, dtype=dtype).alias(col)
+            for col, dtype in ingest.schema.items()
+        )
+    ))
+
+
 def from_mList(ingest: pl.DataFrame, /) -> pl.DataFrame:
 
     assert tree_hook(ingest)["mList"][-1]
@@ -506,9 +1318,10 @@ def from_mList(ingest: pl.DataFrame, /) -> pl.DataFrame:
     ).rechunk()
 
 
-def from_mALPC(ingest: pl.DataFrame, /, *, max_depth: int = 100) -> pl.LazyFrame:
+def from_mALPC(ingest: pl.DataFrame, /, *, max_depth: int = 100, pointer_doubling: bool = False) -> pl.LazyFrame:
     # from ALIST to FULL model
     # previously called to_flat_from_alist
+    # pointer_doubling resolves every path-to-root in O(log depth) join rounds and ignores max_depth
 
     assert tree_hook(ingest)["mALPC"][-1]
 
@@ -524,58 +1337,97 @@ def from_mALPC(ingest: pl.DataFrame, /, *, max_depth: int = 100) -> pl.LazyFrame
         check_parent.drop_nulls().unique().sort().implode().set_sorted(),
         nulls_equal=False
     ).not_()
-    n_leaves, leaves = pl.collect_all((
-        ingest.lazy().filter(~leaves_expr).select(cchild, cparent),
-        ingest.lazy().filter(leaves_expr).select(cchild, cparent)
-    ))
-    del check_parent, leaves_expr
+    mark: tuple[float, int] | None = _stage_mark()
+    if pointer_doubling:
+        ws_path, ws_jump = "xWS_Path", "xWS_Jump"
+        lifted: pl.DataFrame = ingest.select(cchild, pl.concat_list(cchild).alias(ws_path), pl.col(cparent).alias(ws_jump))
+        # each node carries its path upwards, from itself to (but excluding) the node it jumps to; every round
+        # appends the jump target's own path and adopts its jump, so the jump distance doubles 1, 2, 4, 8, ...
+
+        for _ in range(ingest.height.bit_length() + 1):
+            if not lifted.select(pl.col(ws_jump).is_not_null().any()).to_series().item(0):
+                break
+            lifted: pl.DataFrame = (
+                lifted.lazy()
+                .join(
+                    other=lifted.lazy().select(
+                        pl.col(cchild).alias(ws_jump), pl.col(ws_path, ws_jump).name.suffix("_Δ")
+                    ),
+                    on=ws_jump, how="left", nulls_equal=False, maintain_order="left"
+                )
+                .select(
+                    cchild,
+                    pl.when(pl.col(ws_jump).is_null()).then(ws_path)
+                    .otherwise(pl.concat_list(ws_path, pl.coalesce(ws_path + "_Δ", pl.concat_list(ws_jump))))
+                    .alias(ws_path),
+                    pl.col(ws_jump + "_Δ").alias(ws_jump)
+                )
+                .collect()
+            )
+        else:
+            assert False, "The adjacency list contains a cycle"
 
-    while leaves.select(cs.last().is_not_null().any()).to_series().item(0) and leaves.shape[-1] < max_depth:
-        leaves: pl.DataFrame = (
-            leaves.lazy()
-            .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cs.expand_selector(leaves, cs.last())[-1],    right_on=cchild, suffix=f"_{leaves.shape[-1]+0:03}join")
-            .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+0:03}join",    right_on=cchild, suffix=f"_{leaves.shape[-1]+1:03}join")
-            .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+1:03}join",    right_on=cchild, suffix=f"_{leaves.shape[-1]+2:03}join")
-            .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+2:03}join",    right_on=cchild, suffix=f"_{leaves.shape[-1]+3:03}join")
-            .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+3:03}join",    right_on=cchild, suffix=f"_{leaves.shape[-1]+4:03}join")
-            .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+4:03}join",    right_on=cchild, suffix=f"_{leaves.shape[-1]+5:03}join")
-            .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+5:03}join",    right_on=cchild, suffix=f"_{leaves.shape[-1]+6:03}join")
-            .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+6:03}join",    right_on=cchild, suffix=f"_{leaves.shape[-1]+7:03}join")
-            .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+7:03}join",    right_on=cchild, suffix=f"_{leaves.shape[-1]+8:03}join")
-            .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+8:03}join",    right_on=cchild, suffix=f"_{leaves.shape[-1]+9:03}join")
-            .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+9:03}join",    right_on=cchild, suffix=f"_{leaves.shape[-1]+10:03}join")
-            .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+10:03}join",   right_on=cchild, suffix=f"_{leaves.shape[-1]+11:03}join")
-            .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+11:03}join",   right_on=cchild, suffix=f"_{leaves.shape[-1]+12:03}join")
-            .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+12:03}join",   right_on=cchild, suffix=f"_{leaves.shape[-1]+13:03}join")
-            .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+13:03}join",   right_on=cchild, suffix=f"_{leaves.shape[-1]+14:03}join")
-            .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+14:03}join",   right_on=cchild, suffix=f"_{leaves.shape[-1]+15:03}join")
-            .select(cchild, cs.starts_with(cparent))
-            .collect()
-        )
+        leaves: pl.DataFrame = lifted.filter(leaves_expr).select(ws_path)
+        path_to_root: pl.Expr = pl.col(ws_path).list.reverse()
+        del check_parent, leaves_expr, lifted
 
-    del n_leaves
+        going_from_roots_down_to_the_leaves: range = range(leaves.select(pl.col(ws_path).list.len().max()).to_series().item(0))
 
-    leaves: pl.DataFrame = (
-        leaves
-        .lazy()
-        .select(leaves.columns[:max_depth+1][:-(
+    else:
+        n_leaves, leaves = pl.collect_all((
+            ingest.lazy().filter(~leaves_expr).select(cchild, cparent),
+            ingest.lazy().filter(leaves_expr).select(cchild, cparent)
+        ))
+        del check_parent, leaves_expr
+
+        while leaves.select(cs.last().is_not_null().any()).to_series().item(0) and leaves.shape[-1] < max_depth:
+            leaves: pl.DataFrame = (
+                leaves.lazy()
+                .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cs.expand_selector(leaves, cs.last())[-1],    right_on=cchild, suffix=f"_{leaves.shape[-1]+0:03}join")
+                .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+0:03}join",    right_on=cchild, suffix=f"_{leaves.shape[-1]+1:03}join")
+                .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+1:03}join",    right_on=cchild, suffix=f"_{leaves.shape[-1]+2:03}join")
+                .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+2:03}join",    right_on=cchild, suffix=f"_{leaves.shape[-1]+3:03}join")
+                .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+3:03}join",    right_on=cchild, suffix=f"_{leaves.shape[-1]+4:03}join")
+                .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+4:03}join",    right_on=cchild, suffix=f"_{leaves.shape[-1]+5:03}join")
+                .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+5:03}join",    right_on=cchild, suffix=f"_{leaves.shape[-1]+6:03}join")
+                .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+6:03}join",    right_on=cchild, suffix=f"_{leaves.shape[-1]+7:03}join")
+                .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+7:03}join",    right_on=cchild, suffix=f"_{leaves.shape[-1]+8:03}join")
+                .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+8:03}join",    right_on=cchild, suffix=f"_{leaves.shape[-1]+9:03}join")
+                .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+9:03}join",    right_on=cchild, suffix=f"_{leaves.shape[-1]+10:03}join")
+                .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+10:03}join",   right_on=cchild, suffix=f"_{leaves.shape[-1]+11:03}join")
+                .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+11:03}join",   right_on=cchild, suffix=f"_{leaves.shape[-1]+12:03}join")
+                .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+12:03}join",   right_on=cchild, suffix=f"_{leaves.shape[-1]+13:03}join")
+                .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+13:03}join",   right_on=cchild, suffix=f"_{leaves.shape[-1]+14:03}join")
+                .join(other=n_leaves.lazy(), how="left", nulls_equal=False, left_on=cparent + f"_{leaves.shape[-1]+14:03}join",   right_on=cchild, suffix=f"_{leaves.shape[-1]+15:03}join")
+                .select(cchild, cs.starts_with(cparent))
+                .collect()
+            )
+
+        del n_leaves
+
+        leaves: pl.DataFrame = (
             leaves
-            .select(pl.sum_horizontal(pl.col(leaves.columns[:max_depth+1][-16:]).is_not_null().any().not_()))
-            .to_series().item(0)
-        )])
-        .collect()
-    )
+            .lazy()
+            .select(leaves.columns[:max_depth+1][:-(
+                leaves
+                .select(pl.sum_horizontal(pl.col(leaves.columns[:max_depth+1][-16:]).is_not_null().any().not_()))
+                .to_series().item(0)
+            )])
+            .collect()
+        )
+        path_to_root: pl.Expr = pl.concat_list(pl.all()).list.reverse().list.drop_nulls()
+        going_from_roots_down_to_the_leaves: range = range(len(leaves.columns))
 
-    going_from_roots_down_to_the_leaves: range = range(len(leaves.columns))
+    leaves: pl.DataFrame = _stage("from_mALPC:path_to_root", leaves, ingest, mark=mark)
     going_from_leaves_up_to_the_roots: range = range(max(going_from_roots_down_to_the_leaves), - 1, - 1)
     # going from roots down(↓) to the leaves [0, 1, 2, 3, ...] ascending(↑) integers (cdepth)
     # going from leaves up(↑) to the roots [..., 3, 2, 1, 0] descending(↓) integers (cdepth)
 
-    ingest: pl.LazyFrame = (
+    ingest: pl.LazyFrame = _stage("from_mALPC:to_flat", (
         leaves
         .lazy()
         .select(
-            pl.concat_list(pl.all()).list.reverse().list.drop_nulls()
+            path_to_root
             .list.to_struct(fields=
                 [f"p{qq:03}_{max(going_from_roots_down_to_the_leaves)}" for qq in going_from_roots_down_to_the_leaves],
             ).struct.unnest()
@@ -587,16 +1439,198 @@ def from_mALPC(ingest: pl.DataFrame, /, *, max_depth: int = 100) -> pl.LazyFrame
             [cs_ptr.replace_strict(old=ingest.get_column(cchild), new=ingest.get_column(cbkey), default=None)] +
             [pl.col(uv).replace_strict(old=ingest.get_column(cchild), new=ingest.get_column(uv), default=None).alias(uv) for uv in user_val]
         )
-    )
+    ), leaves)
 
     del leaves
 
     return ingest
 
 
-def test_equal(tree_x: pl.DataFrame, tree_y: pl.DataFrame, /) -> bool:
-    tree_x = tree_x.select(chead, ctail, cdepth, cstart, cstop)
-    tree_y = tree_y.select(tree_x.columns)
+def _json_paths(dtype: pl.Struct, prefix: tuple[str, ...], /) -> Iterator[tuple[tuple[str, ...], pl.DataType | None]]:
+    # the key paths of a JSON object schema in pre-order, with the dtype of each leaf value (None for objects)
+    for field in dtype.fields:
+        yield prefix + (field.name,), (None if isinstance(field.dtype, pl.Struct) else field.dtype)
+        if isinstance(field.dtype, pl.Struct):
+            yield from _json_paths(field.dtype, prefix + (field.name,))
+
+
+def from_mJSON(ingest: dict | str, /, *, root: str = None, value: str = "user_value", infer_schema_length: int | None = None) -> pl.LazyFrame:
+    """
+    Converts nested JSON objects into an MVP model: a dict, a JSON object string, a .json file or an NDJSON
+    file of one object per line, which is scanned lazily. Every object is one Root tree, labelled by its
+    top-level root field (cast to String) or else by its position. Every key below it is a node, whose
+    children are the keys of its object value; a key holding anything else is a leaf, and that value goes
+    to the value column, so leaf values need a common supertype. Keys holding null count as absent, and
+    arrays are leaf values. The schema is inferred from every document by default; a key first seen after
+    the first infer_schema_length documents is not in it, and is not read. Every document is laid out in
+    the schema's key order (first seen first), not in its own sibling order.
+    Only the inferred schema is walked in Python: the rows themselves are built by one list of structs
+    per document, exploded, so no Python object is created per node.
+    """
+    if isinstance(ingest, dict):
+        documents: pl.LazyFrame = pl.from_dicts([ingest], infer_schema_length=None).lazy()
+    elif ingest.lstrip()[:1] == "{":
+        documents: pl.LazyFrame = pl.read_json(BytesIO(ingest.encode()), infer_schema_length=infer_schema_length).lazy()
+    elif Path(ingest).suffix == ".json":
+        documents: pl.LazyFrame = pl.read_json(ingest, infer_schema_length=infer_schema_length).lazy()
+    else:
+        documents: pl.LazyFrame = pl.scan_ndjson(ingest, infer_schema_length=infer_schema_length)
+
+    schema: pl.Schema = documents.collect_schema()
+    assert root is None or root in schema, f"The documents have no top-level {root} field"
+    paths: tuple[tuple[tuple[str, ...], pl.DataType | None], ...] = tuple(_json_paths(
+        pl.Struct({name: dtype for name, dtype in schema.items() if name != root}), ()
+    ))
+    value_dtype: pl.DataType = pl.concat(how="vertical_relaxed", items=[
+        pl.DataFrame(schema={value: dtype}) for _, dtype in paths if dtype is not None
+    ] or [pl.DataFrame(schema={value: pl.Null})]).schema[value]
+    # one value column for every leaf, of their common supertype
+
+    ws_node, ws_document = "yWS", "xWS_Document"
+    field: Callable[[tuple[str, ...]], pl.Expr] = lambda path: (
+        pl.col(path[0]) if len(path) == 1 else field(path[:-1]).struct.field(path[-1])
+    )
+    return (
+        documents
+        .with_row_index(ws_document)
+        .select(
+            pl.concat_list(
+                pl.struct(
+                    (pl.col(root) if root else pl.col(ws_document)).cast(dtype=pl.String).alias(ctail),
+                    pl.lit(0, dtype=_sys_dtype).alias(cdepth),
+                    pl.lit(None, dtype=value_dtype).alias(value)
+                ),
+                *(
+                    pl.when(field(path).is_not_null()).then(pl.struct(
+                        pl.lit(path[-1], dtype=pl.String).alias(ctail),
+                        pl.lit(len(path), dtype=_sys_dtype).alias(cdepth),
+                        (pl.lit(None, dtype=value_dtype) if dtype is None else field(path).cast(dtype=value_dtype)).alias(value)
+                    ))
+                    for path, dtype in paths
+                )
+            )
+            .list.drop_nulls().alias(ws_node)
+        )
+        .explode(ws_node)
+        .unnest(ws_node)
+    )
+
+
+def to_mALPC(ingest: pl.DataFrame, /) -> pl.DataFrame:
+    """
+    Exports a FULL model as the adjacency list from_mALPC reads: cChild is the cStart of every node, cParent
+    the cStart of its parent (NULL for Roots), cBKey its cTail, followed by the user columns. Every parent
+    comes from one backward as-of join by depth (_with_parent), so the export is a single linear pass.
+    """
+    user_cols: tuple[str, ...] = tuple(cs.expand_selector(ingest, ~(cs_ptr | cs_vis | cs_core_12 | cs_hash | cs_uqu)))
+    return (
+        _with_parent(ingest.select(cstart, cdepth, ctail, *user_cols))
+        .select(pl.col("xWS_Parent").alias(cparent), pl.col(cstart).alias(cchild), pl.col(ctail).alias(cbkey), *user_cols)
+        .collect()
+    )
+
+
+def to_mList(ingest: pl.DataFrame, /) -> pl.DataFrame:
+    """
+    Exports a FULL model as the path lists from_mList reads: cPTR holds the cTail labels from the Root down to
+    every node, followed by the user columns. A model with its p### columns already holds every path, and they
+    are concatenated as they are. Without them, each node contributes cDepth + 1 entries, and the ancestor at
+    depth k of node i is the last node of depth k at or before i: one sorted search of the key (k, i) in the
+    (cDepth, cStart) order of the nodes finds them all at once, and the entries are imploded per node.
+    """
+    user_cols: tuple[str, ...] = tuple(cs.expand_selector(ingest, ~(cs_ptr | cs_vis | cs_core_12 | cs_hash | cs_uqu)))
+    if cs.expand_selector(ingest, cs_ptr):
+        return ingest.select(pl.concat_list(sorted(cs.expand_selector(ingest, cs_ptr))).list.drop_nulls().alias(cptr), *user_cols)
+
+    ws_node, ws_key = "xWS_Node", "xWS_Key"
+    rows: int = ingest.height
+    path_len: pl.Expr = pl.col(cdepth).cast(dtype=pl.Int64).add(1)
+    keys: pl.Series = ingest.select(pl.col(cdepth).cast(dtype=pl.UInt64).mul(rows).add(pl.col(cstart)).sort().alias(ws_key)).to_series()
+
+    entries: pl.DataFrame = ingest.select(pl.int_range(pl.len(), dtype=pl.UInt64).repeat_by(path_len).explode().alias(ws_node))
+    entries: pl.DataFrame = entries.select(
+        ws_node,
+        pl.int_range(pl.len(), dtype=pl.UInt64)
+        .sub(pl.lit(ingest.select(path_len.cum_sum().sub(path_len)).to_series().cast(dtype=pl.UInt64)).gather(ws_node))
+        .mul(rows).add(pl.col(ws_node)).alias(ws_key)
+        # ↑↑↑ the key (k, i) of every entry, k counting from 0 within the entries of node i
+    ).select(
+        ws_node,
+        pl.lit(ingest.get_column(ctail)).gather(
+            pl.lit(keys).gather(pl.lit(keys).search_sorted(pl.col(ws_key), side="right").sub(1)).mod(rows)
+        ).alias(cptr)
+    )
+
+    return ingest.select(
+        entries.with_columns(pl.col(ws_node).set_sorted()).group_by(ws_node, maintain_order=True).agg(cptr).get_column(cptr),
+        # the entries are in node order, and a sorted key is grouped by its runs rather than hashed
+        *user_cols
+    )
+
+
+def sink_mJSON(ingest: pl.DataFrame | pl.LazyFrame, path: str, /, *, root: str = None, value: str = None, rows_per_batch: int = 1_000_000) -> None:
+    """
+    Writes a model (MVP or FULL) as NDJSON, one nested object per Root tree, which from_mJSON reads back:
+    every node is a key of its parent's object, a node with children holds an object and a leaf holds its
+    value column (or null). The Root label goes to the root field when root is set; Root and inner node
+    values have no place in the JSON and are dropped, and sibling labels must be unique Strings. Each row
+    becomes one text fragment (separator, key, opening brace or value, closing braces), and the fragments of
+    a Root are joined into its line, one batch of whole Root trees at a time.
+    """
+    ingest: pl.LazyFrame = ingest.lazy()
+    assert ingest.collect_schema()[ctail] == pl.String, "JSON keys are Strings"
+    ws_prev, ws_next, ws_root, ws_line = "xWS_Prev", "xWS_Next", "xWS_Root", "xWS_Line"
+    json: Callable[[pl.Expr], pl.Expr] = lambda expr: pl.struct(expr.alias("_")).struct.json_encode().str.slice(5).str.head(-1)
+    # ↑↑↑ {"_":...} less its wrapping: a JSON value, with the escaping and number formatting of Polars
+
+    partitions, depth_widths = _root_partitions(ingest, rows_per_batch)
+    closing: pl.Expr = pl.lit("}" * depth_widths.height)
+    with open(path, "wb") as ndjson:
+        for offset, length in partitions:
+            (
+                ingest.slice(offset=offset, length=length)
+                .select(
+                    ctail, pl.col(cdepth).cast(dtype=pl.Int64), *((value,) if value else ()),
+                    pl.col(cdepth).cast(dtype=pl.Int64).shift(1, fill_value=0).alias(ws_prev),
+                    pl.col(cdepth).cast(dtype=pl.Int64).shift(-1, fill_value=0).alias(ws_next),
+                    pl.col(cdepth).eq(0).cum_sum().set_sorted().alias(ws_root)
+                )
+                .select(ws_root, pl.concat_str(
+                    pl.when(pl.col(cdepth).eq(0)).then(pl.concat_str(pl.lit("{"), *((json(pl.lit(root)), pl.lit(":"), json(pl.col(ctail))) if root is not None else ()))),
+                    pl.when(pl.col(cdepth).gt(0) & (pl.col(ws_prev).ge(pl.col(cdepth)) | pl.lit(root is not None) & pl.col(cdepth).eq(1))).then(pl.lit(",")),
+                    # ↑↑↑ a node follows its previous sibling's subtree, or the root field
+                    pl.when(pl.col(cdepth).gt(0)).then(pl.concat_str(json(pl.col(ctail)), pl.lit(":"))),
+                    pl.when(pl.col(cdepth).gt(0) & pl.col(ws_next).le(pl.col(cdepth))).then(json(pl.col(value)) if value else pl.lit("null"))
+                    .when(pl.col(cdepth).gt(0)).then(pl.lit("{")),
+                    # ↑↑↑ a leaf holds its value, any other node opens its object
+                    closing.str.head(pl.col(cdepth).sub(pl.col(ws_next)).clip(lower_bound=0)),
+                    pl.when(pl.col(cdepth).eq(0) & pl.col(ws_next).eq(0)).then(pl.lit("}")),
+                    # ↑↑↑ the last node of a Root closes every object down to it, a Root without children closes itself
+                    ignore_nulls=True
+                ).alias(ws_line))
+                .group_by(ws_root, maintain_order=True)
+                .agg(pl.col(ws_line).str.join(""))
+                .select(ws_line)
+                .collect()
+                .write_csv(ndjson, include_header=False, quote_style="never")
+                # JSON escapes every line break inside a string, so each line is one document
+            )
+
+
+def test_equal(tree_x: pl.DataFrame, tree_y: pl.DataFrame, /, *, ignore_sibling_order: bool = False) -> bool:
+    tree_x, tree_y = (
+        tree.select(
+            pl.struct(col).struct.json_encode().alias(col) if isinstance(tree.schema[col], (pl.Array, pl.List)) else pl.col(col)
+            for col in (chead, ctail, cdepth, cstart, cstop)
+        )
+        for tree in (tree_x, tree_y)
+    )
+    # Polars cannot sort or join on Array labels, their JSON encoding compares alike
+    if ignore_sibling_order:
+        # isomorphic forests: one canonical form hash per Root tree, compared as sorted multisets
+        return tree_x.height == tree_y.height and gen_tree_hashes(tree_x).get_column(hk_iso).sort().equals(
+            gen_tree_hashes(tree_y).get_column(hk_iso).sort()
+        )
     if tree_x.equals(tree_y):
         return True
     else:
@@ -619,6 +1653,714 @@ def test_equal(tree_x: pl.DataFrame, tree_y: pl.DataFrame, /) -> bool:
     return False
 
 
+def tree_diff(old: pl.DataFrame, new: pl.DataFrame, /) -> pl.DataFrame:
+    """
+    Reports what changed between two FULL models (e.g. two daily snapshots), keyed on the gen_hash_keys hash
+    keys: one row per added, removed, moved, unchanged or changed subtree, with its [cStart, cStop) range in
+    the old and in the new model. A node is matched by its path (hkPTR) and its subtree compared by its tree
+    digests (hkSchemaTree, hkNSpaceTree), so sibling order is ignored and labels below a node compare as
+    hkNSpace normalizes them. Stored keys are reused; missing ones cost one gen_hash_keys pass, O(n), over
+    that model. Going from the roots down, only changed nodes are descended into: an unchanged subtree is
+    reported once, at its highest node, and never read further. The children of the changed nodes are cut
+    from their [cStart, cStop) ranges, so no step reads the rest of the model. The compared paths must be
+    unique, as validate_model requires (no repeated sibling labels under a changed node).
+    A moved subtree is a removed and an added subtree with the same label and the same tree digests.
+    """
+    key_cols: tuple[str, ...] = (hk_ptr, hk_schema_tree, hk_nspace_tree)
+    old, new = (
+        model if all(col in model.columns for col in key_cols) else model.with_columns(
+            gen_hash_keys(model.drop(cs_hash), as_uint64=model.schema.get(hk_ptr, pl.UInt64) == pl.UInt64, trees=True)
+            .select(col for col in key_cols if col not in model.columns)
+        )
+        for model in (old, new)
+    )
+    # ↑↑↑ only the missing keys are taken from gen_hash_keys, stored ones are kept as they are
+    assert old.schema[ctail] == new.schema[ctail] and old.schema[hk_ptr] == new.schema[hk_ptr], \
+        "Both models need the same label dtype (it salts the hash keys) and the same hash key dtype"
+
+    ws_change, ws_rank = "change", "xWS_Rank"
+    diff_cols: tuple[str, ...] = (hk_ptr, ctail, hk_schema_tree, hk_nspace_tree, cstart, cstop)
+    children: Callable[[pl.DataFrame, int, pl.DataFrame], pl.DataFrame] = lambda model, depth, parents: (
+        model.select(*diff_cols)[
+            parents.select(pl.int_ranges(pl.col(cstart).add(1), cstop).alias(ws_rank)).explode(ws_rank).drop_nulls()
+            .filter(pl.lit(model.get_column(cdepth)).gather(pl.col(ws_rank)).eq(depth)).get_column(ws_rank)
+        ]
+    )
+    # the nodes one depth below the parents, cut from the parents' [cStart, cStop) ranges (cStart is the row)
+
+    frontier_old, frontier_new = (model.filter(pl.col(cdepth).eq(0)).select(*diff_cols) for model in (old, new))
+    reported: list[pl.DataFrame] = []
+    for descent in count(1):
+        if not (frontier_old.height or frontier_new.height):
+            break
+        assert not (frontier_old.get_column(hk_ptr).is_duplicated().any() or frontier_new.get_column(hk_ptr).is_duplicated().any()), \
+            "Every compared path (hkPTR) must be unique, as validate_model requires: repeated sibling labels have no one to one match"
+        matched: pl.DataFrame = (
+            frontier_old
+            .join(frontier_new, on=hk_ptr, how="full", suffix="_new", coalesce=False)
+            .select(
+                pl.when(pl.col(hk_ptr + "_new").is_null()).then(pl.lit("removed"))
+                .when(pl.col(hk_ptr).is_null()).then(pl.lit("added"))
+                .when(pl.col(hk_schema_tree).eq_missing(pl.col(hk_schema_tree + "_new")) & pl.col(hk_nspace_tree).eq_missing(pl.col(hk_nspace_tree + "_new")))
+                .then(pl.lit("unchanged"))
+                .otherwise(pl.lit("changed")).alias(ws_change),
+                pl.coalesce(hk_ptr + "_new", hk_ptr).alias(hk_ptr),
+                pl.coalesce(ctail + "_new", ctail).alias(ctail),
+                pl.coalesce(hk_schema_tree + "_new", hk_schema_tree).alias(hk_schema_tree),
+                pl.coalesce(hk_nspace_tree + "_new", hk_nspace_tree).alias(hk_nspace_tree),
+                pl.col(cstart).alias(cstart + "_old"), pl.col(cstop).alias(cstop + "_old"),
+                pl.col(cstart + "_new"), pl.col(cstop + "_new")
+            )
+        )
+        reported.append(matched)
+        changed: pl.DataFrame = matched.filter(pl.col(ws_change).eq("changed"))
+        frontier_old, frontier_new = (
+            children(model, descent, changed.select(pl.col(cstart + side).alias(cstart), pl.col(cstop + side).alias(cstop)))
+            for model, side in ((old, "_old"), (new, "_new"))
+        )
+        # ↑↑↑ only the children of changed nodes are compared at the next depth
+
+    reported: pl.DataFrame = pl.concat(reported, how="vertical")
+    moves: pl.DataFrame = (
+        reported.filter(pl.col(ws_change).eq("removed"))
+        .with_columns(pl.int_range(pl.len()).over(ctail, hk_schema_tree, hk_nspace_tree).alias(ws_rank))
+        .join(
+            reported.filter(pl.col(ws_change).eq("added"))
+            .with_columns(pl.int_range(pl.len()).over(ctail, hk_schema_tree, hk_nspace_tree).alias(ws_rank)),
+            on=(ctail, hk_schema_tree, hk_nspace_tree, ws_rank), how="inner", nulls_equal=True, suffix="_Δ"
+        )
+        .select(
+            pl.lit("moved").alias(ws_change), pl.col(hk_ptr + "_Δ").alias(hk_ptr), ctail,
+            cstart + "_old", cstop + "_old", pl.col(cstart + "_new_Δ").alias(cstart + "_new"), pl.col(cstop + "_new_Δ").alias(cstop + "_new")
+        )
+    )
+    # ↑↑↑ same label and same tree digests, paired one to one in pre-order
+
+    return (
+        pl.concat(how="vertical", items=(
+            reported
+            .filter(
+                ~(pl.col(ws_change).eq("removed") & pl.col(cstart + "_old").is_in(moves.get_column(cstart + "_old"))) &
+                ~(pl.col(ws_change).eq("added") & pl.col(cstart + "_new").is_in(moves.get_column(cstart + "_new")))
+            )
+            .select(moves.columns),
+            moves
+        ))
+        .sort(cstart + "_new", cstart + "_old", nulls_last=True)
+    )
+
+
+def _float_subtree_totals(ingest: pl.DataFrame, col: str, /) -> pl.Series:
+    # the sum of col over each subtree, NULLs as 0, with no running total: each level's subtree totals are
+    # added into their parents, deepest level first, so a total only ever holds the rows of its own subtree
+    ws_parent, ws_total = "xWS_Parent", "xWS_Total"
+    levels: dict[tuple, pl.DataFrame] = (
+        _with_parent(ingest.select(cstart, cdepth)).drop_nulls(ws_parent).collect()
+        .partition_by(cdepth, as_dict=True, include_key=False)
+    )
+    total: pl.Series = ingest.get_column(col).fill_null(0)
+    for depth in sorted(levels, reverse=True):
+        level: pl.DataFrame = levels[depth]
+        up: pl.DataFrame = (
+            level.with_columns(total.gather(level.get_column(cstart)).alias(ws_total))
+            .group_by(ws_parent).agg(pl.col(ws_total).sum())
+        )
+        parents: pl.Series = up.get_column(ws_parent)
+        total: pl.Series = total.scatter(parents, total.gather(parents) + up.get_column(ws_total))
+    return total
+
+
+def subtree_aggregate(ingest: pl.DataFrame, aggs: dict[str, tuple[str, ...]], /) -> pl.DataFrame:
+    """
+    Adds one rollup column per (column, operation) of aggs, {column}_{operation}, aggregating column over
+    each node's whole subtree, itself included, for every node at once. Operations are sum, count (of non
+    NULL values), mean, min and max; NULLs are ignored as in Polars. Every subtree is the run of rows
+    [cStart, cStop), so sum, count and mean are differences of prefix sums (one pass), and min and max are
+    two overlapping lookups in a sparse table (log2 passes, whatever the depth), instead of one row per
+    (ancestor, descendant) pair from a cLeft/cRight range join. Float running totals would cancel a small
+    subtree under a large earlier value, so Float sums and means add subtree totals into their parents
+    instead, one depth level at a time from the leaves up.
+    """
+    assert all(op in ("sum", "count", "mean", "min", "max") for ops in aggs.values() for op in ops)
+    assert ingest.is_empty() or (ingest.item(0, cstart) == 0 and ingest.item(-1, cstart) == ingest.height - 1), \
+        "The model must be whole: cStart is the row position"
+
+    ws_level, ws_ceil, ws_total, ws_count, ws_last = "xWS_Level", "xWS_Ceil", "xWS_Total", "xWS_Count", "xWS_Last"
+    last: pl.Expr = pl.col(cstop).cast(dtype=pl.Int64).sub(1)
+    ranged: Callable[[str], pl.Expr] = lambda prefix: pl.col(prefix).gather(last).sub(pl.col(prefix).shift(1, fill_value=0))
+    # the running total at the last row of the subtree, less the running total before its first row
+
+    for col, ops in aggs.items():
+        if not {"sum", "count", "mean"} & set(ops):
+            continue
+        prefix: pl.DataFrame = ingest.select(
+            cstop, pl.col(col).fill_null(0).cum_sum().alias(ws_total), pl.col(col).is_not_null().cast(dtype=_sys_dtype).cum_sum().alias(ws_count)
+        ).select(ranged(ws_total).alias(ws_total), ranged(ws_count).alias(ws_count))
+        if ingest.schema[col].is_float():
+            prefix: pl.DataFrame = prefix.with_columns(_float_subtree_totals(ingest, col).alias(ws_total))
+        ingest: pl.DataFrame = ingest.with_columns(
+            {
+                "sum": prefix.get_column(ws_total), "count": prefix.get_column(ws_count),
+                "mean": prefix.select(pl.when(pl.col(ws_count).gt(0)).then(pl.col(ws_total).truediv(ws_count))).to_series()
+            }[op].alias(f"{col}_{op}")
+            for op in ops if op in ("sum", "count", "mean")
+        )
+
+    k_max: int = max(ingest.get_column(csize).max() or 1, 1).bit_length() - 1
+    bounds: pl.DataFrame = ingest.select(
+        pl.col(cstart).cast(dtype=pl.Int64), last.alias(ws_last),
+        pl.lit(31, dtype=pl.Int64).sub(pl.col(csize).cast(dtype=pl.UInt32).bitwise_leading_zeros()).alias(ws_ceil)
+        # ↑↑↑ the level k of each subtree, the largest 2^k no longer than its cSize
+    )
+    for col, ops in aggs.items():
+        for op in (op for op in ops if op in ("min", "max")):
+            horizontal: Callable[..., pl.Expr] = pl.min_horizontal if op == "min" else pl.max_horizontal
+            work: pl.DataFrame = bounds.with_columns(ingest.get_column(col).alias(ws_level), pl.lit(None, dtype=ingest.schema[col]).alias(col))
+            for k in range(k_max + 1):
+                # level k holds the min (max) of the 2^k rows from each row on; a subtree at level k is
+                # covered by the two, overlapping, runs of 2^k rows at its first row and ending at its last
+                work: pl.DataFrame = work.with_columns(
+                    pl.when(pl.col(ws_ceil).eq(k)).then(horizontal(
+                        pl.col(ws_level),
+                        pl.col(ws_level).gather(pl.max_horizontal(cstart, pl.col(ws_last).sub(2 ** k - 1)))
+                    )).otherwise(pl.col(col)).alias(col),
+                    horizontal(ws_level, pl.col(ws_level).shift(-(2 ** k))).alias(ws_level)
+                )
+            ingest: pl.DataFrame = ingest.with_columns(work.get_column(col).alias(f"{col}_{op}"))
+
+    return ingest
+
+
+def path_accumulate(ingest: pl.DataFrame, expr: str | pl.Expr, op: str, /, *, include_self: bool = True) -> pl.DataFrame:
+    """
+    Adds {name}_path_{op}, expr accumulated down each node's path from its Root, for every node at once:
+    sum (e.g. cost allocation), prod (e.g. BOM quantities), min or max. With include_self=False the node
+    itself is left out (NULL for Roots). NULLs are skipped; a path without values is NULL. Every node jumps
+    to its parent and takes the accumulation of the run it jumps over, then adopts that node's jump, so the
+    distance doubles 1, 2, 4, 8, ... and the deepest path is done in log2(depth) vectorized rounds.
+    """
+    assert op in ("sum", "prod", "min", "max")
+    assert ingest.is_empty() or (ingest.item(0, cstart) == 0 and ingest.item(-1, cstart) == ingest.height - 1), \
+        "The model must be whole: cStart is the row position"
+
+    expr: pl.Expr = pl.col(expr) if isinstance(expr, str) else expr
+    combine: Callable[[pl.Expr, pl.Expr], pl.Expr] = {
+        "sum": pl.Expr.add, "prod": pl.Expr.mul, "min": pl.min_horizontal, "max": pl.max_horizontal
+    }[op]
+    ws_parent, ws_jump, ws_acc = "xWS_Parent", "xWS_Jump", "xWS_Acc"
+    work: pl.DataFrame = (
+        _with_parent(ingest.select(cstart, cdepth))
+        .select(ws_parent, pl.col(ws_parent).alias(ws_jump))
+        .collect()
+        .with_columns(ingest.select(expr.alias(ws_acc)).to_series())
+    )
+    # each node holds the accumulation of its path upwards, from itself to (but excluding) the node it jumps to
+
+    for _ in range((ingest.get_column(cdepth).max() or 0).bit_length()):
+        if not work.select(pl.col(ws_jump).is_not_null().any()).item():
+            break
+        above: pl.Expr = pl.col(ws_acc).gather(ws_jump)
+        work: pl.DataFrame = work.with_columns(
+            pl.coalesce(combine(above, pl.col(ws_acc)), above, ws_acc).alias(ws_acc),
+            pl.col(ws_jump).gather(ws_jump).alias(ws_jump)
+        )
+
+    return ingest.with_columns(
+        (work.get_column(ws_acc) if include_self else work.select(pl.col(ws_acc).gather(ws_parent)).to_series())
+        .alias(f"{expr.meta.output_name()}_path_{op}")
+    )
+
+
+def gen_ancestors(ingest: pl.DataFrame, queries: pl.Series, /, *, by: str = cstart, include_self: bool = False) -> pl.DataFrame:
+    """
+    Finds the ancestor chain of every queried node in a FULL model, as a cPTR list of cStart positions
+    ordered from the Root down. Queries are cStart positions (by=cStart) or labels (by=cTail, one row per
+    matching node). Nodes of one depth cover disjoint, sorted cStart ranges, so the ancestor at each depth
+    is a single sorted search: O(N·log n) per depth instead of a quadratic cLeft/cRight interval join.
+    """
+    assert by in (cstart, ctail)
+
+    if by == cstart:
+        nodes: pl.DataFrame = pl.DataFrame({cstart: queries.cast(dtype=_sys_dtype, strict=True)}).with_columns(
+            pl.lit(ingest.get_column(cdepth)).gather(pl.col(cstart)).alias(cdepth)
+        )
+    else:
+        nodes: pl.DataFrame = (
+            pl.DataFrame({ctail: pl.Series(values=queries, dtype=ingest.schema[ctail], strict=False)})
+            .join(ingest.select(ctail, cstart, cdepth), on=ctail, how="inner", maintain_order="left")
+        )
+
+    ws_query = "xWS_Query"
+    nodes: pl.DataFrame = nodes.with_row_index(ws_query)
+    starts_by_depth: dict[int, pl.Series] = {
+        depth: frame.get_column(cstart).set_sorted()
+        for (depth,), frame in ingest.select(cdepth, cstart).partition_by(cdepth, as_dict=True, maintain_order=True).items()
+    }
+    going_from_roots_down_to_the_leaves: range = range(nodes.get_column(cdepth).max() or 0)
+    # a Root has no ancestors, so the deepest query bounds the depths worth searching
+
+    ancestors: pl.DataFrame = pl.concat(how="vertical", items=(
+        nodes.clear().select(ws_query, pl.col(cstart).alias(cptr)),
+        # Root-only queries have no ancestors at all
+        *(
+            nodes
+            .filter(pl.col(cdepth).gt(descent))
+            .select(
+                ws_query,
+                pl.lit(starts_by_depth[descent]).gather(
+                    pl.lit(starts_by_depth[descent]).search_sorted(pl.col(cstart), side="right").sub(1)
+                ).alias(cptr)
+            )
+            for descent in going_from_roots_down_to_the_leaves
+        ),
+        *((nodes.select(ws_query, pl.col(cstart).alias(cptr)),) if include_self else ())
+    ))
+    # the ancestors are built long (one row per query and depth) and imploded per query, which is several times
+    # cheaper than a concat_list across one column per depth
+
+    return (
+        nodes
+        .join(
+            ancestors.group_by(ws_query, maintain_order=True).agg(cptr),
+            on=ws_query, how="left", maintain_order="left"
+        )
+        .select(
+            ~cs.by_name(ws_query, cdepth, cptr),
+            pl.col(cptr).fill_null(pl.lit([], dtype=pl.List(_sys_dtype)))
+        )
+    )
+
+
+def render_model(ingest: pl.DataFrame, /, *, offset: int = 0, length: int = None, vis_all: bool = False) -> pl.DataFrame:
+    """
+    Renders the v### box drawing columns for a window of rows of a FULL model, and returns that window alone
+    (a subtree is offset=cStart, length=cSize). The glyphs derive from cDepth, cStop and cTail, and each one
+    depends on the row's ancestors only. Every ancestor of a row in the window that starts before the window
+    is also an ancestor of its first row, so those few rows are all the context the window needs.
+    """
+    window: pl.DataFrame = ingest.slice(offset=offset, length=length)
+    if not window.height:
+        return window
+
+    going_from_roots_down_to_the_leaves: range = range(
+        len(cs.expand_selector(ingest, cs_ptr)) or ingest.get_column(cdepth).max() + 1
+    )
+    ws_pos = "xWS_Pos"
+    chain, floor, stop, span = [], ingest.item(offset, cdepth), offset, 64
+    while floor and stop:
+        # an ancestor is a row shallower than every row after it up to the window; scan back in doubling
+        # spans only as far as the Root, instead of partitioning the whole model for gen_ancestors
+        scan: pl.DataFrame = ingest.slice(offset=max(stop - span, 0), length=min(span, stop)).select(
+            pl.int_range(max(stop - span, 0), stop).alias(ws_pos), cdepth
+        )
+        chain[:0] = scan.filter(pl.col(cdepth).lt(pl.min_horizontal(
+            pl.col(cdepth).reverse().cum_min().reverse().shift(-1), pl.lit(floor, dtype=_sys_dtype)
+        ))).get_column(ws_pos).to_list()
+        floor, stop, span = min(floor, scan.get_column(cdepth).min()), stop - scan.height, span * 2
+    context: pl.DataFrame = ingest[chain]
+    build_cvis_a, build_cvis_b = _build_cvis(going_from_roots_down_to_the_leaves[::-1], vis_all=vis_all)
+
+    return (
+        pl.concat((context, window), how="vertical")
+        .select(~cs_vis)
+        .with_columns(*build_cvis_a[::-1])
+        .with_columns(*build_cvis_b)
+        .slice(offset=context.height)
+        .select(cs_ptr, cs_vis, ~(cs_ptr | cs_vis))
+    )
+
+
+def _reshape_levels(ingest: pl.DataFrame, going_from_roots_down_to_the_leaves: range, /, *, vis: bool) -> pl.DataFrame:
+    # renames, pads or drops the p### (and v###) columns of a FULL model to the given levels; padding is NULL for
+    # p### and void for v###, and a dropped level must already be empty
+    ptr_key_cols: tuple[str, ...] = tuple(sorted(cs.expand_selector(ingest, cs_ptr)))
+    vis_key_cols: tuple[str, ...] = tuple(sorted(cs.expand_selector(ingest, cs_vis)))
+    return ingest.select(
+        *(
+            (pl.col(ptr_key_cols[descent]) if descent < len(ptr_key_cols) else pl.lit(None, dtype=ingest.schema[ctail]))
+            .alias(f"p{descent:03}_{max(going_from_roots_down_to_the_leaves)}")
+            for descent in going_from_roots_down_to_the_leaves
+        ),
+        *(
+            (pl.col(vis_key_cols[descent]) if descent < len(vis_key_cols) else vis_void)
+            .alias(f"v{descent:03}_{max(going_from_roots_down_to_the_leaves)}")
+            for descent in (going_from_roots_down_to_the_leaves if vis else ())
+        ),
+        ~(cs_ptr | cs_vis)
+    )
+
+
+def _splice_model(ingest: pl.DataFrame, rows: pl.DataFrame, /, *, start: int, stop: int, parent: int | None, vis_all: bool) -> pl.DataFrame:
+    # replaces the rows [start, stop) of a FULL model (one whole subtree, or an empty range on a child boundary of
+    # parent) with rows: one whole subtree or nothing, carrying its final p###, cHead, cTail and cDepth, and cStart
+    # and cStop relative to its own Root. The rows after the splice shift, the ancestors of the splice grow or
+    # shrink, cWidth is rewritten for the depths touched, and v### is rendered again for parent's subtree only.
+    assert not cs.expand_selector(ingest, cs_hash | cs_uqu), "Drop the hash keys before editing and regenerate them after"
+
+    removed: pl.DataFrame = ingest.slice(offset=start, length=stop - start)
+    shift: int = rows.height - removed.height
+    vis: bool = bool(cs.expand_selector(ingest, cs_vis))
+    chain: list[int] = [] if parent is None else (
+        gen_ancestors(ingest, pl.Series([parent]), include_self=True).get_column(cptr).item(0).to_list()
+    )
+    # parent and its ancestors, from the Root down, all of them before the splice
+
+    depth_widths: pl.DataFrame = (
+        pl.concat(how="vertical", items=(
+            ingest.select(cdepth, pl.col(cwidth).cast(dtype=pl.Int64)).unique(subset=cdepth, keep="any"),
+            rows.group_by(cdepth).agg(pl.len().cast(dtype=pl.Int64).alias(cwidth)),
+            removed.group_by(cdepth).agg(pl.len().cast(dtype=pl.Int64).neg().alias(cwidth))
+        ))
+        .group_by(cdepth).agg(pl.col(cwidth).sum())
+        .filter(pl.col(cwidth).gt(0))
+    )
+    assert depth_widths.get_column(cdepth).max() or 0, "The edit leaves no model behind, or Root trees alone, which p###_N cannot hold"
+    touched: list[int] = pl.concat((rows.get_column(cdepth), removed.get_column(cdepth))).unique().to_list()
+    widest_levels: range = range(max(len(cs.expand_selector(ingest, cs_ptr)), len(cs.expand_selector(rows, cs_ptr))))
+    going_from_roots_down_to_the_leaves: range = range(depth_widths.get_column(cdepth).max() + 1)
+
+    spliced: pl.DataFrame = pl.concat(how="vertical", items=(
+        part.pipe(_reshape_levels, widest_levels, vis=vis).select(ingest.pipe(_reshape_levels, widest_levels, vis=vis).columns)
+        for part in (
+            ingest.slice(offset=0, length=start).with_columns(
+                pl.when(pl.col(cstart).is_in(chain)).then(pl.col(cstop).cast(dtype=pl.Int64).add(shift))
+                .otherwise(pl.col(cstop)).cast(dtype=_sys_dtype),
+                pl.when(pl.col(cstart).is_in(chain[-1:])).then(pl.col(cout).cast(dtype=pl.Int64).add(int(rows.height > 0) - int(removed.height > 0)))
+                .otherwise(pl.col(cout)).cast(dtype=ingest.schema[cout])
+            ),
+            # ↑↑↑ before the splice, only parent and its ancestors change
+            rows.with_columns(pl.col(cstart, cstop).add(pl.lit(start, dtype=_sys_dtype))),
+            # ↑↑↑ the splice itself, already carrying its final labels and depths
+            ingest.slice(offset=stop).with_columns(pl.col(cstart, cstop).cast(dtype=pl.Int64).add(shift).cast(dtype=_sys_dtype))
+            # ↑↑↑ after the splice, everything shifts
+        )
+        if part.height
+    ))
+
+    spliced: pl.DataFrame = (
+        spliced
+        .with_columns(
+            pl.when(pl.col(cdepth).is_in(touched)).then(
+                pl.col(cdepth).replace_strict(depth_widths.get_column(cdepth), depth_widths.get_column(cwidth), default=0)
+            ).otherwise(pl.col(cwidth)).cast(dtype=ingest.schema[cwidth]).alias(cwidth),
+            pl.col(cstop).sub(cstart).cast(dtype=ingest.schema[csize]).alias(csize),
+            pl.col(cdepth).eq(0).alias(cis_root),
+            pl.col(cstop).sub(cstart).eq(1).alias(cis_leaf),
+            pl.col(cstart).mul(2).sub(cdepth).add(1).cast(dtype=_sys_dtype).alias(cleft),
+            pl.col(cstop).mul(2).sub(cdepth).cast(dtype=_sys_dtype).alias(cright)
+        )
+        .pipe(_reshape_levels, going_from_roots_down_to_the_leaves, vis=vis)
+    )
+    # the nested set bounds are cheap to derive again; cWidth is only rewritten where the splice changed a count
+
+    if not vis:
+        return spliced
+
+    window: tuple[int, int] = (chain[-1], spliced.item(chain[-1], cstop)) if chain else (start, start + rows.height)
+    # v### glyphs depend on a row's ancestors alone, so only parent's subtree can change
+
+    return pl.concat(how="vertical", items=(
+        spliced.slice(offset=0, length=window[0]),
+        spliced.pipe(render_model, offset=window[0], length=window[1] - window[0], vis_all=vis_all),
+        spliced.slice(offset=window[1])
+    ))
+
+
+def _subtree_rows(ingest: pl.DataFrame, subtree: pl.DataFrame | pl.LazyFrame, parent: int | None, /) -> pl.DataFrame:
+    # expands an MVP subtree on its own and grafts it under parent: p### gains parent's path as a prefix, cHead
+    # and cDepth follow, and the user columns line up with the model's. The subtree is expanded below a virtual
+    # Root, dropped again afterwards, since a lone leaf has no p###_N naming of its own (N must be at least 1)
+    user_cols: tuple[str, ...] = tuple(cs.expand_selector(ingest, ~(cs_ptr | cs_vis | cs_core_12 | cs_hash | cs_uqu)))
+    subtree: pl.DataFrame = subtree.lazy().collect()
+    assert subtree.height and subtree.get_column(cdepth).eq(0).sum() == 1 and subtree.item(0, cdepth) == 0, \
+        "The subtree must be an MVP model holding exactly one Root tree"
+    assert set(subtree.columns) - {ctail, cdepth} <= set(user_cols), "The subtree has columns the model lacks"
+
+    local: pl.DataFrame = (
+        pl.concat(how="vertical_relaxed", items=(
+            subtree.select(ctail, pl.lit(0, dtype=_sys_dtype).alias(cdepth)).head(1),
+            subtree.select(ctail, pl.col(cdepth).add(1).cast(dtype=_sys_dtype))
+        ))
+        .pipe(expand_model)
+        .collect()
+        .slice(offset=1)
+        .hstack(subtree.select(~cs.by_name(ctail, cdepth)))
+    )
+    path: tuple = () if parent is None else tuple(
+        ingest.row(parent, named=True)[ptr_key_col] for ptr_key_col in sorted(cs.expand_selector(ingest, cs_ptr))[:ingest.item(parent, cdepth) + 1]
+    )
+    local_ptr_key_cols: tuple[str, ...] = tuple(sorted(cs.expand_selector(local, cs_ptr)))[1:]
+    going_from_roots_down_to_the_leaves: range = range(max(len(path) + len(local_ptr_key_cols), 2))
+    # a lone new Root leaf is padded to p000_1 and p001_1
+
+    return local.select(
+        *(
+            (
+                pl.lit(path[descent], dtype=ingest.schema[ctail]) if descent < len(path) else
+                pl.col(local_ptr_key_cols[descent - len(path)]).cast(dtype=ingest.schema[ctail]) if descent - len(path) < len(local_ptr_key_cols) else
+                pl.lit(None, dtype=ingest.schema[ctail])
+            ).alias(f"p{descent:03}_{max(going_from_roots_down_to_the_leaves)}")
+            for descent in going_from_roots_down_to_the_leaves
+        ),
+        (pl.lit(path[0], dtype=ingest.schema[chead]) if path else pl.col(local_ptr_key_cols[0]).cast(dtype=ingest.schema[chead])).alias(chead),
+        pl.col(ctail).cast(dtype=ingest.schema[ctail]),
+        pl.col(cdepth).sub(1).add(len(path)).cast(dtype=ingest.schema[cdepth]),
+        pl.col(cstart, cstop).sub(1).cast(dtype=_sys_dtype),
+        *(pl.col(col).cast(dtype=ingest.schema[col]) for col in (csize, cwidth, cout, cleft, cright, cis_root, cis_leaf)),
+        *(pl.col(col).cast(dtype=ingest.schema[col]) if col in local.columns else pl.lit(None, dtype=ingest.schema[col]).alias(col) for col in user_cols)
+    )
+
+
+def delete_subtree(ingest: pl.DataFrame, at: int, /, *, vis_all: bool = False) -> pl.DataFrame:
+    """
+    Removes the subtree rooted at cStart position at from a FULL model, in place of a full rebuild. The rows
+    before the subtree are kept as they are, apart from its ancestors, and the rows after it only shift;
+    cWidth changes for the depths the subtree covered and v### is rendered again below its parent alone.
+    """
+    chain: list[int] = gen_ancestors(ingest, pl.Series([at])).get_column(cptr).item(0).to_list()
+    return _splice_model(ingest, ingest.clear(), start=at, stop=ingest.item(at, cstop), parent=chain[-1] if chain else None, vis_all=vis_all)
+
+
+def insert_subtree(ingest: pl.DataFrame, subtree: pl.DataFrame | pl.LazyFrame, /, *, parent: int = None, position: int = None, vis_all: bool = False) -> pl.DataFrame:
+    """
+    Grafts one MVP tree into a FULL model as a child of the node at cStart position parent, or as a
+    new Root tree when parent is None. The new subtree lands at cStart position, which must sit on a child
+    boundary of parent, and defaults to after the last child (or after the last Root tree). A subtree whose
+    Root label clashes with one of its new siblings is refused, since the two paths would become one.
+    """
+    if parent is None:
+        position: int = ingest.height if position is None else position
+        assert position == ingest.height or ingest.item(position, cdepth) == 0, "The position must be a Root tree boundary"
+        siblings: pl.Series = ingest.filter(pl.col(cis_root)).get_column(ctail)
+    else:
+        position: int = ingest.item(parent, cstop) if position is None else position
+        assert parent < position <= ingest.item(parent, cstop), "The position must be inside the subtree of parent"
+        assert position == ingest.item(parent, cstop) or ingest.item(position, cdepth) == ingest.item(parent, cdepth) + 1, \
+            "The position must be a child boundary of parent"
+        siblings: pl.Series = (
+            ingest.slice(offset=parent + 1, length=ingest.item(parent, csize) - 1)
+            .filter(pl.col(cdepth).eq(ingest.item(parent, cdepth) + 1)).get_column(ctail)
+        )
+
+    rows: pl.DataFrame = _subtree_rows(ingest, subtree, parent)
+    assert not siblings.is_in(rows.get_column(ctail).head(1)).any(), "The subtree Root label clashes with a sibling"
+
+    return _splice_model(ingest, rows, start=position, stop=position, parent=parent, vis_all=vis_all)
+
+
+def move_subtree(ingest: pl.DataFrame, at: int, /, *, parent: int = None, position: int = None, vis_all: bool = False) -> pl.DataFrame:
+    """
+    Moves the subtree rooted at cStart position at under the node at cStart position parent (or out to a new
+    Root tree), as one delete_subtree followed by one insert_subtree. Both positions refer to the model before
+    the move, and the subtree cannot move into itself.
+    """
+    stop: int = ingest.item(at, cstop)
+    assert parent is None or not (at <= parent < stop), "A subtree cannot move into itself"
+    assert position is None or not (at < position < stop), "A subtree cannot move into itself"
+
+    subtree: pl.DataFrame = ingest.slice(offset=at, length=stop - at).select(
+        ctail, pl.col(cdepth).sub(ingest.item(at, cdepth)), ~(cs_ptr | cs_vis | cs_core_12 | cs_hash | cs_uqu)
+    )
+    relocate = lambda before: before if before is None or before < stop else before - (stop - at)
+
+    return (
+        ingest
+        .pipe(delete_subtree, at, vis_all=vis_all)
+        .pipe(insert_subtree, subtree, parent=relocate(parent), position=relocate(position), vis_all=vis_all)
+    )
+
+
+class TreeIndex:
+    """
+    An in-memory lookup structure built once over a FULL model. It maps every cTail label, and every hkPTR
+    key when gen_hash_keys has been applied, to the (cStart, cSize) runs of its subtrees. Single lookups are
+    dictionary hits and return zero-copy slices of the model; batch lookups are a single hash join against
+    the prebuilt runs, so neither rescans the frame.
+    """
+
+    def __init__(self, ingest: pl.DataFrame, /):
+        assert all(col in ingest.columns for col in (ctail, cstart, csize))
+        self.model: pl.DataFrame = ingest.rechunk()
+        # a single chunk keeps every slice a zero-copy view
+
+        ws_hash = "xWS_Hash"
+        self._runs: dict[str, pl.DataFrame] = {
+            ctail: self.model.select(pl.col(ctail).hash().alias(ws_hash), cstart, csize)
+        } | ({hk_ptr: self.model.select(hk_ptr, cstart, csize)} if hk_ptr in self.model.columns else {})
+        label_runs: pl.DataFrame = (
+            self.model
+            .group_by(pl.col(ctail).hash().alias(ws_hash), maintain_order=True)
+            .agg(cstart, csize, pl.col(ctail).n_unique())
+        )
+        assert label_runs.get_column(ctail).eq(1).all(), "Two distinct cTail labels share a 64-bit hash"
+        self._lookup: dict[str, dict] = {
+            ctail: {label_hash: tuple(zip(starts, sizes)) for label_hash, starts, sizes, _ in label_runs.iter_rows()}
+        } | ({
+            hk_ptr: {hash_key: ((start, size),) for hash_key, start, size in self._runs[hk_ptr].iter_rows()}
+        } if hk_ptr in self.model.columns else {})
+        # labels are keyed on their Polars hash so Struct, Array and Enum labels work alike; every hash maps to a
+        # single label, so a hit is verified against its first run only
+
+    def runs(self, key, /, *, by: str = ctail) -> tuple[tuple[int, int], ...]:
+        assert by in self._lookup, f"The index has no {by} column"
+        if by != ctail:
+            return self._lookup[by].get(key, ())
+        query: pl.Series = pl.Series(values=[key], dtype=self.model.schema[ctail], strict=False)
+        found: tuple[tuple[int, int], ...] = () if query.has_nulls() else self._lookup[ctail].get(query.hash().item(0), ())
+        return found if found and self.model.get_column(ctail).slice(found[0][0], 1).equals(query, check_names=False) else ()
+
+    def subtrees(self, key, /, *, by: str = ctail) -> tuple[pl.DataFrame, ...]:
+        return tuple(self.model.slice(offset=start, length=size) for start, size in self.runs(key, by=by))
+
+    def lookup(self, keys: pl.Series, /, *, by: str = ctail) -> pl.DataFrame:
+        """
+        Batch form of runs: one row per (query, subtree) pair, in query order, with the query's position
+        in keys alongside its cStart and cSize. Unknown keys produce no rows.
+        """
+        assert by in self._runs, f"The index has no {by} column"
+        ws_query, ws_hash = "xWS_Query", "xWS_Hash"
+        queries: pl.DataFrame = pl.DataFrame({
+            ws_query: pl.int_range(len(keys), dtype=_sys_dtype, eager=True),
+            by: pl.Series(values=keys, dtype=self.model.schema[by], strict=False)
+        })
+        if by != ctail:
+            return queries.join(self._runs[by], on=by, how="inner", maintain_order="left").select(ws_query, by, cstart, csize)
+        return (
+            queries
+            .with_columns(pl.col(ctail).hash().alias(ws_hash))
+            .join(self._runs[ctail], on=ws_hash, how="inner", maintain_order="left")
+            .filter(pl.col(ctail).eq(pl.lit(self.model.get_column(ctail)).gather(pl.col(cstart))))
+            .select(ws_query, ctail, cstart, csize)
+        )
+
+
+class TreeStore:
+    """
+    A FULL model served from memory-mapped Arrow IPC files, for many processes at once. write stores the
+    model uncompressed in a single record batch, alongside a label index (the cTail hash of every node,
+    sorted, with its cStart and cSize). Opening maps both files and reads nothing; every slice is a
+    zero-copy view of the mapping, so processes reading one store share its pages through the page cache.
+    A label lookup is a binary search of the index, verified against the model as in TreeIndex. The label
+    hashes are Polars hashes, so a store is read by the Polars version that wrote it.
+    """
+
+    @classmethod
+    def write(cls, ingest: pl.DataFrame, path: str, /) -> "TreeStore":
+        assert all(col in ingest.columns for col in (ctail, cstart, csize))
+        ws_hash = "xWS_Hash"
+        index: pl.DataFrame = ingest.select(pl.col(ctail).hash().alias(ws_hash), cstart, csize).sort(ws_hash, cstart)
+        assert (
+            ingest.select(pl.col(ctail).hash().alias(ws_hash), ctail).unique().get_column(ws_hash).is_unique().all()
+        ), "Two distinct cTail labels share a 64-bit hash"
+        ingest.rechunk().write_ipc(path, compression="uncompressed")
+        index.rechunk().write_ipc(Path(path).with_suffix(".index.arrow"), compression="uncompressed")
+        # uncompressed and one record batch: a mapped column is a single contiguous buffer
+
+        return cls(path)
+
+    def __init__(self, path: str, /):
+        self.path: str = path
+        self.model: pl.DataFrame = pl.read_ipc(path, memory_map=True, rechunk=False)
+        self._index: pl.DataFrame = pl.read_ipc(Path(path).with_suffix(".index.arrow"), memory_map=True, rechunk=False)
+
+    def close(self) -> None:
+        # the mappings are released with the last frame (or slice) that references them
+        self.model, self._index = self.model.clear(), self._index.clear()
+
+    def __enter__(self) -> "TreeStore":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def slice(self, start: int, size: int = None, /) -> pl.DataFrame:
+        return self.model.slice(offset=start, length=self.model.item(start, csize) if size is None else size)
+
+    def runs(self, key, /) -> tuple[tuple[int, int], ...]:
+        query: pl.Series = pl.Series(values=[key], dtype=self.model.schema[ctail], strict=False)
+        if query.has_nulls():
+            return ()
+        lo, hi = self._index.select(
+            cs.first().search_sorted(query.hash(), side="left").alias("lo"), cs.first().search_sorted(query.hash(), side="right").alias("hi")
+        ).row(0)
+        found: tuple[tuple[int, int], ...] = tuple(self._index.slice(offset=lo, length=hi - lo).select(cstart, csize).iter_rows())
+        return found if found and self.model.get_column(ctail).slice(found[0][0], 1).equals(query, check_names=False) else ()
+
+    def subtrees(self, key, /) -> tuple[pl.DataFrame, ...]:
+        return tuple(self.model.slice(offset=start, length=size) for start, size in self.runs(key))
+
+
+class LCAIndex:
+    """
+    A lowest common ancestor engine built once over a FULL model, for millions of node pairs per call. In
+    pre-order, the LCA of two nodes in different branches is the parent of the shallowest node after the
+    first one, up to and including the second. A sparse table of (cDepth, cStart) minima over the rows
+    answers that range minimum with two lookups, so a batch of pairs is a handful of vectorized gathers.
+    Levels only go up to the largest Root, since nodes of different Roots have no common ancestor.
+    """
+
+    def __init__(self, ingest: pl.DataFrame, /):
+        assert all(col in ingest.columns for col in (cdepth, cstart, cstop))
+        assert ingest.is_empty() or (ingest.item(0, cstart) == 0 and ingest.item(-1, cstart) == ingest.height - 1), \
+            "The model must be whole: cStart is the row position"
+
+        ws_parent, ws_root_stop, ws_level = "xWS_Parent", "xWS_RootStop", "xWS_Level"
+        nodes: pl.DataFrame = _with_parent(ingest.select(cstart, cdepth, cstop)).with_columns(
+            pl.col(cstop).cast(dtype=pl.Int64),
+            pl.when(pl.col(cdepth).eq(0)).then(cstop).forward_fill().cast(dtype=pl.Int64).alias(ws_root_stop)
+        ).collect()
+        self._stop, self._root_stop, self._parent = nodes.get_column(cstop), nodes.get_column(ws_root_stop), nodes.get_column(ws_parent)
+        self._rows: int = ingest.height
+
+        k_max: int = max((nodes.filter(pl.col(cdepth).eq(0)).select(pl.col(cstop).sub(cstart).max()).item() or 1) - 1, 1).bit_length() - 1
+        # two nodes of one Root are at most its cSize - 1 rows apart
+        level: pl.DataFrame = nodes.select(pl.col(cdepth).cast(dtype=pl.UInt64).mul(2 ** 32).add(pl.col(cstart)).alias(ws_level))
+        # one UInt64 orders by cDepth first and carries the cStart of the minimum along
+        levels: list[pl.Series] = [level.get_column(ws_level)]
+        for k in range(1, k_max + 1):
+            level: pl.DataFrame = level.select(pl.min_horizontal(ws_level, pl.col(ws_level).shift(-(2 ** (k - 1)))).alias(ws_level))
+            levels.append(level.get_column(ws_level))
+        self._table: pl.Series = pl.concat(levels, rechunk=True)
+        # level k holds the minimum of the 2^k rows from each row on, at k times the row count onwards
+
+    def lca(self, x: pl.Series, y: pl.Series, /, *, name: str = "uqLCA") -> pl.Series:
+        """
+        The uq struct of every (x, y) pair of cStart positions, in pair order. cPTR holds the cStart of the
+        LCA, or is empty for nodes of different Roots; cIsLCA is True when one node of the pair is the LCA
+        (it is, or is an ancestor of, the other) and cIsUQE when the pair is a single node.
+        """
+        assert name.startswith("uq") and len(x) == len(y)
+
+        ws_lo, ws_hi, ws_branch, ws_k, ws_lca = "xWS_Lo", "xWS_Hi", "xWS_Branch", "xWS_K", "xWS_LCA"
+        stop, table, parent = pl.lit(self._stop), pl.lit(self._table), pl.lit(self._parent)
+        pairs: pl.DataFrame = pl.DataFrame({
+            ws_lo: x.cast(dtype=pl.Int64, strict=True), ws_hi: y.cast(dtype=pl.Int64, strict=True)
+        }).select(
+            pl.min_horizontal(ws_lo, ws_hi).alias(ws_lo), pl.max_horizontal(ws_lo, ws_hi).alias(ws_hi)
+        ).with_columns(
+            pl.col(ws_hi).ge(stop.gather(ws_lo)).and_(pl.col(ws_hi).lt(pl.lit(self._root_stop).gather(ws_lo))).alias(ws_branch)
+            # ↑↑↑ the later node is outside the subtree of the earlier one, but in the same Root
+        ).with_columns(
+            pl.when(ws_branch).then(pl.lit(63, dtype=pl.Int64).sub(pl.col(ws_hi).sub(pl.col(ws_lo)).cast(dtype=pl.UInt64).bitwise_leading_zeros())).alias(ws_k)
+            # ↑↑↑ the level k of the range (first, second], the largest 2^k no longer than it
+        ).with_columns(
+            pl.when(pl.col(ws_hi).lt(stop.gather(ws_lo))).then(ws_lo).otherwise(
+                parent.gather(pl.min_horizontal(
+                    table.gather(pl.col(ws_k).mul(self._rows).add(pl.col(ws_lo)).add(1)),
+                    table.gather(pl.col(ws_k).mul(self._rows).add(pl.col(ws_hi)).sub(pl.lit(2, dtype=pl.Int64).pow(pl.col(ws_k))).add(1))
+                ).mod(2 ** 32))
+            ).alias(ws_lca)
+        )
+
+        return pairs.select(pl.struct(
+            pl.col(ws_hi).lt(stop.gather(ws_lo)).alias("cIsLCA"),
+            pl.col(ws_lo).eq(pl.col(ws_hi)).alias("cIsUQE"),
+            pl.when(pl.col(ws_lca).is_not_null()).then(pl.col(ws_lca).cast(dtype=_sys_dtype).reshape((-1, 1)).cast(dtype=pl.List(_sys_dtype)))
+            .otherwise(pl.lit([], dtype=pl.List(_sys_dtype))).alias(cptr)
+            # a one-column reshape is a zero-copy Array, many times cheaper than a concat_list per row
+        ).alias(name)).to_series()
+
+
 if __name__ == "__main__":
     pl.show_versions()
 
@@ -628,10 +2370,10 @@ if __name__ == "__main__":
 
     # demonstration
 
-    assert pl.read_parquet(example_mvp).pipe(expand_model, verify_first_n=10_000).collect().shape == (20, 22)
-    assert pl.read_parquet(unit_test_aa_mvp).pipe(expand_model, verify_first_n=10_000).collect().shape == (52_529, 32)
-    assert pl.read_parquet(unit_test_bb_mvp).pipe(expand_model, verify_first_n=10_000).collect().shape == (52_419, 32)
-    assert pl.read_parquet(unit_test_cc_mvp).pipe(expand_model, verify_first_n=10_000).collect().shape == (49_246, 32)
+    assert pl.read_parquet(example_mvp).pipe(expand_model, vis=True, verify_first_n=10_000).collect().shape == (20, 22)
+    assert pl.read_parquet(unit_test_aa_mvp).pipe(expand_model, vis=True, verify_first_n=10_000).collect().shape == (52_529, 32)
+    assert pl.read_parquet(unit_test_bb_mvp).pipe(expand_model, vis=True, verify_first_n=10_000).collect().shape == (52_419, 32)
+    assert pl.read_parquet(unit_test_cc_mvp).pipe(expand_model, vis=True, verify_first_n=10_000).collect().shape == (49_246, 32)
 
     p_sep = 'parent> <child'
     for this_df, this_node in [
@@ -639,7 +2381,7 @@ if __name__ == "__main__":
         [unit_test_cc_mvp, {"type": 99, "obj": "kX"}]
     ]:
         print(f"\n\n\nSQL Queries for: {this_df=}  {this_node=}  {type(this_node)=}", end="")
-        this_df: pl.DataFrame = pl.read_parquet(this_df).select(~(cs.starts_with("user_value") | cs.by_name("BLOCK_ID"))).head(50).pipe(expand_model).collect()
+        this_df: pl.DataFrame = pl.read_parquet(this_df).select(~(cs.starts_with("user_value") | cs.by_name("BLOCK_ID"))).head(50).pipe(expand_model, vis=True).collect()
         print(f"  {this_df.schema[ctail]=}")
 
         query0 = f"""SELECT * FROM this_df;"""
@@ -701,10 +2443,10 @@ if __name__ == "__main__":
     this_df: pl.DataFrame = (
         this_df
         .pipe(from_mALPC)
-        .pipe(expand_model).collect()
+        .pipe(expand_model, vis=True).collect()
     )
     assert this_df.equals(
-        pl.read_parquet(example_mvp).pipe(expand_model).collect()
+        pl.read_parquet(example_mvp).pipe(expand_model, vis=True).collect()
     )
     # demo pipeline to treat an adjacency list model; test against equivalent MVP Parquet
     db.sql(f"""SELECT * FROM this_df;""").show(max_rows=50, max_width=5_000)